@@ -2,15 +2,44 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
 from models import db
+import os
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    CORS(app) # Enable CORS for all routes
+    # Enable CORS for all routes; pagination cursors and ETags travel in response headers
+    CORS(app, expose_headers=['X-Next-Cursor', 'X-Latest-Cursor', 'ETag'])
 
     db.init_app(app)
 
+    # Process-wide caches are keyed by row ids and versions only; never carry them over from another app's database
+    reset_caches()
+
+    # Registers the hook that builds the full-text index whenever the items table is created
+    import services.search
+    # Registers the mapper events that keep item_terms and alert_keywords in step
+    import services.keyword_index
+
+    from services.response_cache import response_cache
+    response_cache.init_app(app)
+
+    from services.event_broker import event_broker
+    event_broker.init_app(app)
+
+    # New auctions are matched against every saved alert from the first request on
+    from services.alert_percolator import alert_percolator
+    alert_percolator.init_app(app)
+
+    if app.config.get('BID_SEQUENCER'):
+        from services.bid_sequencer import BidSequencer
+        app.extensions['bid_sequencer'] = BidSequencer(
+            app,
+            max_batch=app.config['BID_BATCH_SIZE'],
+            batch_latency=app.config['BID_BATCH_LATENCY_MS'] / 1000.0,
+            durability=app.config['BID_DURABILITY']
+        )
+
     # Import and register blueprints
     from routes.auth import auth_bp
     from routes.items import items_bp
@@ -31,12 +60,52 @@ def create_app():
     from routes.notifications import notifications_bp
     app.register_blueprint(notifications_bp, url_prefix='/api/notification')
 
+    from routes.events import events_bp
+    app.register_blueprint(events_bp, url_prefix='/api/events')
+
     @app.route('/')
     def index():
         return "API is running..."
 
     return app
 
+def reset_caches():
+    """
+    Empty every process-wide cache and counter: the bid index, the response
+    cache, the alert percolator, the event broker and the bid conflict stats.
+    Also for tools that recreate the database under a running app.
+    """
+    from services.bid_index import bid_index
+    from services.response_cache import response_cache
+    from services.alert_percolator import alert_percolator
+    from services.event_broker import event_broker
+    from services.concurrency import bid_stats
+    bid_index.clear()
+    response_cache.clear()
+    alert_percolator.clear()
+    event_broker.clear()
+    bid_stats.reset()
+
+def start_background_jobs(app):
+    """
+    Start the background jobs for a serving process: the auction closer and
+    the alert index refresher. The server entrypoints call this in every
+    serving process, once the tables exist: wsgi.py for gunicorn, uwsgi and
+    `flask run`, and __main__ below for the dev server. Scripts that merely
+    build the app (migrations, seeding, repairs) never start them.
+    """
+    from services.alert_percolator import alert_percolator
+    alert_percolator.start(app)
+
+    if app.config.get('AUCTION_CLOSER') and 'auction_closer' not in app.extensions:
+        from services.auction_closer import AuctionCloser
+        from services.leader import LeaderLease
+        ttl = app.config['LEADER_LEASE_TTL']
+        lease = LeaderLease('auction-closer', ttl=ttl) if ttl > 0 else None
+        closer = AuctionCloser(app, lease=lease, batch_size=app.config['AUCTION_CLOSER_BATCH_SIZE'])
+        app.extensions['auction_closer'] = closer
+        closer.start()
+
 if __name__ == '__main__':
     app = create_app()
     # Create DB tables if they don't exist
@@ -48,5 +117,8 @@ if __name__ == '__main__':
             print("Database tables created.")
         except Exception as e:
             print(f"Error creating tables: {e}")
-            
+
+    # The debug reloader runs this file twice; only the child that serves requests starts the jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_jobs(app)
     app.run(port=5555, debug=True)
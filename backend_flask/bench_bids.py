@@ -0,0 +1,215 @@
+"""
+Bid-path throughput and latency benchmark.
+
+Builds the app with create_app() against a throwaway SQLite database (or
+--database-url), seeds auctions and users, then drives concurrent
+POST /api/bid/<item_id> traffic through the WSGI app from a pool of
+threads. A share of the bids carry an upper_limit so proxy-bid wars are
+part of the load, and --hot sends a share of the traffic to one auction.
+
+Reports bids/sec, p50/p95/p99 latency, SQL statements and commits per
+request, and writes everything as JSON so runs can be compared:
+
+    python bench_bids.py --bids 2000 --threads 8
+    BID_SEQUENCER=true python bench_bids.py --hot 0.9 --output bench_results/seq.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the bid placement path.')
+    parser.add_argument('--auctions', type=int, default=20, help='auctions to seed')
+    parser.add_argument('--users', type=int, default=50, help='bidders to seed')
+    parser.add_argument('--bids', type=int, default=1000, help='bid requests to send')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--proxy-ratio', type=float, default=0.3, help='share of bids with an upper_limit')
+    parser.add_argument('--hot', type=float, default=0.5, help='share of bids aimed at auction #1')
+    parser.add_argument('--seed', type=int, default=527)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--output', help='JSON results path (default bench_results/bids-<timestamp>.json)')
+    return parser.parse_args()
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def seed(app, args):
+    from models import db, User, Item, Auction
+    from routes.auth import generate_token
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        db.create_all()
+        password = generate_password_hash('benchmark')
+        seller = User(username='bench_seller', email='seller@bench.local', password=password)
+        db.session.add(seller)
+        users = [User(username=f'bench_user_{i}', email=f'user{i}@bench.local', password=password)
+                 for i in range(args.users)]
+        db.session.add_all(users)
+        db.session.flush()
+
+        items = []
+        end_time = datetime.utcnow() + timedelta(days=1)
+        for i in range(args.auctions):
+            item = Item(name=f'Bench item {i}', description='benchmark lot', category='Bench', seller_id=seller.id)
+            db.session.add(item)
+            db.session.flush()
+            db.session.add(Auction(item_id=item.id, end_time=end_time, initial_price=10.0,
+                                   current_price=10.0, increment=1.0, min_price=0))
+            items.append(item.id)
+        db.session.commit()
+        tokens = [generate_token(u.id) for u in users]
+    return items, tokens
+
+class Counters:
+    """SQL statements and commits seen by the engine during the run."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.statements = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_statement)
+        event.listen(engine, 'commit', self._on_commit)
+
+    def _on_statement(self, *args):
+        with self._lock:
+            self.statements += 1
+
+    def _on_commit(self, *args):
+        with self._lock:
+            self.commits += 1
+
+def run(app, args, items, tokens):
+    from models import db
+
+    rng = random.Random(args.seed)
+    plan = []
+    for _ in range(args.bids):
+        item_id = items[0] if rng.random() < args.hot else rng.choice(items)
+        plan.append((item_id, rng.randrange(len(tokens)), rng.random() < args.proxy_ratio, rng.randint(1, 3)))
+
+    prices = {item_id: 10.0 for item_id in items}
+    prices_lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    results_lock = threading.Lock()
+    cursor = iter(plan)
+    cursor_lock = threading.Lock()
+
+    with app.app_context():
+        counters = Counters(db.engine)
+
+    def client():
+        http = app.test_client()
+        while True:
+            with cursor_lock:
+                step = next(cursor, None)
+            if step is None:
+                return
+            item_id, user, proxy, steps = step
+            with prices_lock:
+                amount = prices[item_id] + steps
+            body = {'amount': amount}
+            if proxy:
+                body['upper_limit'] = amount + 10 * steps
+            started = time.perf_counter()
+            response = http.post(f'/api/bid/{item_id}', json=body,
+                                 headers={'Authorization': f'Bearer {tokens[user]}'})
+            elapsed = time.perf_counter() - started
+            payload = response.get_json(silent=True) or {}
+            if 'current_price' in payload:
+                with prices_lock:
+                    prices[item_id] = max(prices[item_id], payload['current_price'])
+            with results_lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    threads = [threading.Thread(target=client) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    accepted = statuses.get(201, 0)
+    requests_sent = len(latencies)
+    return {
+        'wall_seconds': round(wall, 3),
+        'requests': requests_sent,
+        'accepted_bids': accepted,
+        'status_counts': {str(k): v for k, v in sorted(statuses.items())},
+        'requests_per_sec': round(requests_sent / wall, 1) if wall else 0.0,
+        'accepted_bids_per_sec': round(accepted / wall, 1) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0.0
+        },
+        'sql_statements': counters.statements,
+        'sql_statements_per_request': round(counters.statements / requests_sent, 2) if requests_sent else 0.0,
+        'commits': counters.commits,
+        'commits_per_request': round(counters.commits / requests_sent, 3) if requests_sent else 0.0
+    }
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='buyme-bench-')
+    # Config reads the environment at import time
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('AUCTION_CLOSER', 'false')
+
+    from app import create_app
+    app = create_app()
+    items, tokens = seed(app, args)
+    results = run(app, args, items, tokens)
+
+    report = {
+        'benchmark': 'bid_path',
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'git_revision': git_revision(),
+        'python': sys.version.split()[0],
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+        'settings': {
+            'auctions': args.auctions,
+            'users': args.users,
+            'bids': args.bids,
+            'threads': args.threads,
+            'proxy_ratio': args.proxy_ratio,
+            'hot': args.hot,
+            'seed': args.seed,
+            'bid_sequencer': app.config.get('BID_SEQUENCER'),
+            'bid_durability': app.config.get('BID_DURABILITY')
+        },
+        'results': results
+    }
+
+    output = args.output or os.path.join('bench_results', f"bids-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == '__main__':
+    main()
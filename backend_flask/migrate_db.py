@@ -0,0 +1,68 @@
+"""
+Bring an existing database up to the current models.
+
+db.create_all() only creates missing tables, so columns added to existing
+models later (e.g. Auction.version) are added here with ALTER TABLE, the
+indexes declared in models.py are created where missing, the full-text
+search index is created if the database predates it, items and alerts
+missing from the keyword index are indexed, and the auction counters are
+rebuilt.
+Safe to run repeatedly.
+"""
+from app import create_app
+from models import db
+from services.search import ensure_search_index
+from services.keyword_index import backfill_keyword_index
+from repair_counters import repair_counters
+from sqlalchemy import inspect, text
+
+def add_missing_columns():
+    inspector = inspect(db.engine)
+    existing_tables = inspector.get_table_names()
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            db.session.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+    db.session.commit()
+    return added
+
+def add_missing_indexes():
+    existing_tables = inspect(db.engine).get_table_names()
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {i['name'] for i in inspect(db.engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+    return created
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        added = add_missing_columns()
+        print(f"Added columns: {', '.join(added)}" if added else "Schema already up to date.")
+        created = add_missing_indexes()
+        print(f"Created indexes: {', '.join(created)}" if created else "Indexes already up to date.")
+        ensure_search_index()
+        print("Full-text search index ready.")
+        items, alerts = backfill_keyword_index()
+        print(f"Keyword index: indexed {items} items and {alerts} alerts.")
+        # Columns added above start at zero; fill them in from bids and participants
+        print(f"Repaired counters on {repair_counters()} auctions.")
@@ -42,7 +42,23 @@ class User(db.Model):
 
 auction_participants = db.Table('auction_participants',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('auction_id', db.Integer, db.ForeignKey('auctions.id'), primary_key=True)
+    db.Column('auction_id', db.Integer, db.ForeignKey('auctions.id'), primary_key=True),
+    # The primary key leads with user_id; listings look participants up by auction
+    db.Index('ix_auction_participants_auction_id', 'auction_id')
+)
+
+# Normalized keyword index (services/keyword_index.py): the tokens of each
+# item's name and description, and the tokens each alert requires
+item_terms = db.Table('item_terms',
+    db.Column('item_id', db.Integer, db.ForeignKey('items.id'), primary_key=True),
+    db.Column('term', db.String(100), primary_key=True),
+    db.Index('ix_item_terms_term', 'term', 'item_id')
+)
+
+alert_keywords = db.Table('alert_keywords',
+    db.Column('alert_id', db.Integer, db.ForeignKey('alerts.id'), primary_key=True),
+    db.Column('token', db.String(100), primary_key=True),
+    db.Index('ix_alert_keywords_token', 'token', 'alert_id')
 )
 
 
@@ -60,6 +76,11 @@ class Item(db.Model):
     auction = db.relationship('Auction', backref='item', uselist=False, lazy=True)
     image_url = db.Column(db.String(500))
 
+    __table_args__ = (
+        db.Index('ix_items_category', 'category'),
+        db.Index('ix_items_seller_id', 'seller_id'),
+    )
+
     def to_dict(self):
         return {
             'item_id': self.id,
@@ -84,6 +105,26 @@ class Auction(db.Model):
     current_price = db.Column(db.Float, default=0.0)
     is_active = db.Column(db.Boolean, default=True)
     winner_id = db.Column(db.Integer, db.ForeignKey('users.id')) # Nullable until won
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bumped on every update
+    # Counters kept in step with bids and auction_participants by the writers (see repair_counters.py)
+    bid_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    participant_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_bid_at = db.Column(db.DateTime)
+
+    # Every ORM update becomes a compare-and-swap on version (StaleDataError on conflict)
+    __mapper_args__ = {'version_id_col': version}
+
+    __table_args__ = (
+        db.Index('ix_auctions_item_id', 'item_id'),
+        db.Index('ix_auctions_winner_id', 'winner_id'),
+        # Listing sort orders
+        db.Index('ix_auctions_start_time', 'start_time'),
+        db.Index('ix_auctions_end_time', 'end_time'),
+        db.Index('ix_auctions_current_price', 'current_price'),
+        db.Index('ix_auctions_bid_count', 'bid_count'),
+        # Auction closer: active auctions by end time
+        db.Index('ix_auctions_active_end_time', 'is_active', 'end_time'),
+    )
 
     bids = db.relationship('Bid', backref='auction', lazy=True, order_by="desc(Bid.amount)")
     participants = db.relationship('User', secondary='auction_participants', backref=db.backref('participated_auctions', lazy=True))
@@ -114,6 +155,15 @@ class Bid(db.Model):
     is_auto_bid = db.Column(db.Boolean, default=False)
     upper_limit = db.Column(db.Float) # For auto-bidding
 
+    __table_args__ = (
+        # Top bids and standing limits per auction
+        db.Index('ix_bids_auction_amount', 'auction_id', 'amount'),
+        # Bid history pages, newest first
+        db.Index('ix_bids_auction_time', 'auction_id', 'time', 'id'),
+        # A user's own bids, newest first
+        db.Index('ix_bids_bidder_time', 'bidder_id', 'time'),
+    )
+
     def to_dict(self):
         return {
             '_id': self.id,
@@ -132,6 +182,11 @@ class Question(db.Model):
     responder_id = db.Column(db.Integer, db.ForeignKey('users.id')) # Customer Rep
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_questions_timestamp', 'timestamp'),
+        db.Index('ix_questions_asker_timestamp', 'asker_id', 'timestamp'),
+    )
+
     def to_dict(self):
         return {
             'question_id': self.id,
@@ -149,7 +204,7 @@ class Alert(db.Model):
     __tablename__ = 'alerts'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    keywords = db.Column(db.Text)  # Comma-separated keywords
+    keywords = db.Column(db.Text)  # Comma-separated keywords as entered; tokens in alert_keywords
     category = db.Column(db.String(100))
     min_price = db.Column(db.Float)
     max_price = db.Column(db.Float)
@@ -157,6 +212,10 @@ class Alert(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', backref=db.backref('alerts', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_alerts_user_active', 'user_id', 'is_active'),
+    )
     
     def to_dict(self):
         return {
@@ -184,6 +243,11 @@ class Notification(db.Model):
     # Relationship handled by backref on User if we wanted, or here
     user_rel = db.relationship('User', backref=db.backref('notifications', lazy=True))
 
+    __table_args__ = (
+        # Unread counts, and a user's latest notifications
+        db.Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -194,3 +258,17 @@ class Notification(db.Model):
             'is_read': self.is_read,
             'time': self.created_at.isoformat() + 'Z' if self.created_at else None
         }
+
+
+class Lease(db.Model):
+    __tablename__ = 'leases'
+    name = db.Column(db.String(100), primary_key=True) # e.g. 'auction-closer'
+    holder = db.Column(db.String(255), nullable=False) # host:pid:token of the current leader
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'holder': self.holder,
+            'expires_at': self.expires_at.isoformat() + 'Z' if self.expires_at else None
+        }
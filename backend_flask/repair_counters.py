@@ -0,0 +1,47 @@
+"""
+Rebuild the denormalized counters on auctions from the source tables.
+
+Auction.bid_count, participant_count and last_bid_at are kept up to date
+by the bid, bid removal and participation paths. This recomputes them with
+one UPDATE and only touches auctions whose stored values drifted (e.g.
+rows written by hand or by an older version of the app). Drifted
+auctions get a new version, so ETags and cached responses move on.
+Safe to run at any time:
+
+    python repair_counters.py
+"""
+from models import db, Auction, Bid, auction_participants
+from services.response_cache import response_cache, AUCTION_SET, AUCTION_BIDS
+from sqlalchemy import func, select, update, or_
+
+def repair_counters():
+    """Returns the number of auctions that were corrected."""
+    bid_count = select(func.count(Bid.id)).where(Bid.auction_id == Auction.id).scalar_subquery()
+    last_bid_at = select(func.max(Bid.time)).where(Bid.auction_id == Auction.id).scalar_subquery()
+    participant_count = select(func.count()).select_from(auction_participants)\
+        .where(auction_participants.c.auction_id == Auction.id).scalar_subquery()
+
+    stmt = update(Auction)\
+        .where(or_(
+            Auction.bid_count != bid_count,
+            Auction.participant_count != participant_count,
+            Auction.last_bid_at.is_distinct_from(last_bid_at)
+        ))\
+        .values(
+            bid_count=bid_count,
+            participant_count=participant_count,
+            last_bid_at=last_bid_at,
+            version=Auction.version + 1
+        )\
+        .execution_options(synchronize_session=False)
+    repaired = db.session.execute(stmt).rowcount
+    if repaired:
+        response_cache.invalidate(AUCTION_SET, AUCTION_BIDS, 'items')
+    db.session.commit()
+    return repaired
+
+if __name__ == '__main__':
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        print(f"Repaired counters on {repair_counters()} auctions.")
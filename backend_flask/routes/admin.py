@@ -1,7 +1,12 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from models import db, Auction, Item, User
 from routes.auth import protect
 from sqlalchemy import func
+from services.concurrency import bid_stats
+from services.alert_percolator import alert_percolator
+from services.event_broker import event_broker
+from services.bid_index import bid_index
+from services.response_cache import response_cache
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -67,3 +72,53 @@ def best_buyers():
         .all()
         
     return jsonify({'data': [{'user': r[0], 'spent': r[1]} for r in results]})
+
+# Optimistic-concurrency conflict and retry rates on the bid path
+@admin_bp.route('/stats/bids', methods=['GET'])
+@protect
+def bid_write_stats():
+    if not request.user.is_admin:
+        return jsonify({'message': 'Not authorized'}), 401
+
+    stats = bid_stats.to_dict()
+    sequencer = current_app.extensions.get('bid_sequencer')
+    stats['sequencer'] = sequencer.to_dict() if sequencer else None
+    stats['bid_index'] = bid_index.to_dict()
+    return jsonify({'data': stats})
+
+# Auction closing scheduler status
+@admin_bp.route('/stats/closer', methods=['GET'])
+@protect
+def closer_stats():
+    if not request.user.is_admin:
+        return jsonify({'message': 'Not authorized'}), 401
+
+    closer = current_app.extensions.get('auction_closer')
+    return jsonify({'data': closer.to_dict() if closer else None})
+
+# Response cache hit, miss and eviction counters
+@admin_bp.route('/stats/cache', methods=['GET'])
+@protect
+def cache_stats():
+    if not request.user.is_admin:
+        return jsonify({'message': 'Not authorized'}), 401
+
+    return jsonify({'data': response_cache.to_dict()})
+
+# Alert percolator size and match counters
+@admin_bp.route('/stats/alerts', methods=['GET'])
+@protect
+def alert_stats():
+    if not request.user.is_admin:
+        return jsonify({'message': 'Not authorized'}), 401
+
+    return jsonify({'data': alert_percolator.to_dict()})
+
+# Live event subscribers and publish counts
+@admin_bp.route('/stats/events', methods=['GET'])
+@protect
+def event_stats():
+    if not request.user.is_admin:
+        return jsonify({'message': 'Not authorized'}), 401
+
+    return jsonify({'data': event_broker.to_dict()})
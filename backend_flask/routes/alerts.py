@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from models import db, Alert, Auction, Item
 from routes.auth import protect
+from services.alert_percolator import alert_percolator
+from services.response_cache import response_cache, AUCTION_SET
+from services.keyword_index import has_term, alert_tokens
 
 alerts_bp = Blueprint('alerts', __name__)
 
@@ -24,6 +27,8 @@ def create_alert():
     )
     
     db.session.add(alert)
+    alert_percolator.track(alert)
+    response_cache.invalidate(f'alerts:{alert.user_id}')
     db.session.commit()
     
     return jsonify({'data': alert.to_dict()}), 201
@@ -60,6 +65,8 @@ def update_alert(alert_id):
     if 'max_price' in data:
         alert.max_price = data['max_price']
     
+    alert_percolator.track(alert)
+    response_cache.invalidate(f'alerts:{alert.user_id}')
     db.session.commit()
     
     return jsonify({'data': alert.to_dict()})
@@ -74,67 +81,58 @@ def delete_alert(alert_id):
         return jsonify({'message': 'Not authorized'}), 401
     
     db.session.delete(alert)
+    alert_percolator.untrack(alert.id)
+    response_cache.invalidate(f'alerts:{alert.user_id}')
     db.session.commit()
     
     return jsonify({'data': {'message': 'Alert deleted'}})
 
+def _alert_filter(alert, tokens):
+    """SQL predicate for the auctions one alert matches."""
+    conditions = []
+    if alert.category:
+        conditions.append(Item.category == alert.category)
+    if alert.min_price:
+        conditions.append(Auction.current_price >= alert.min_price)
+    if alert.max_price:
+        conditions.append(Auction.current_price <= alert.max_price)
+    # Each keyword token is a primary key lookup (a range scan for prefixes) in item_terms
+    for token in tokens:
+        conditions.append(has_term(token))
+    return db.and_(db.true(), *conditions)
+
+def _find_matches(user_id):
+    """Active auctions matching any of the user's active alerts, in one query."""
+    alerts = Alert.query.filter_by(user_id=user_id, is_active=True).all()
+    if not alerts:
+        return []
+    tokens = alert_tokens([alert.id for alert in alerts])
+
+    rows = db.session.query(
+        Auction.id, Item.name, Item.category, Auction.current_price,
+        Auction.start_time, Auction.end_time, Item.image_url
+    ).join(Item, Auction.item_id == Item.id)\
+        .filter(Auction.is_active == True, db.or_(*[_alert_filter(alert, tokens.get(alert.id, ())) for alert in alerts]))\
+        .order_by(Auction.end_time.asc(), Auction.id.asc())\
+        .all()
+
+    return [{
+        'auction_id': row.id,
+        'auction_title': row.name,
+        'category': row.category,
+        'current_price': row.current_price,
+        'start_date': row.start_time.isoformat() + 'Z',
+        'end_date': row.end_time.isoformat() + 'Z',
+        'image_url': row.image_url
+    } for row in rows]
+
 @alerts_bp.route('/matches', methods=['GET'])
 @protect
 def get_matching_auctions():
     """Get active auctions matching user's alerts"""
-    alerts = Alert.query.filter_by(user_id=request.user.id, is_active=True).all()
-    
-    if not alerts:
-        return jsonify({'data': []})
-    
-    matching_auctions = set()
-    
-    for alert in alerts:
-        # Build query based on alert criteria
-        query = db.session.query(Auction, Item).join(Item, Auction.item_id == Item.id)
-        query = query.filter(Auction.is_active == True)
-        
-        # Filter by category
-        if alert.category:
-            query = query.filter(Item.category == alert.category)
-        
-        # Filter by price range
-        if alert.min_price:
-            query = query.filter(Auction.current_price >= alert.min_price)
-        if alert.max_price:
-            query = query.filter(Auction.current_price <= alert.max_price)
-        
-        # Filter by keywords
-        if alert.keywords:
-            keywords = alert.keywords.split(',')
-            for keyword in keywords:
-                keyword = keyword.strip()
-                if keyword:
-                    query = query.filter(
-                        db.or_(
-                            Item.name.ilike(f'%{keyword}%'),
-                            Item.description.ilike(f'%{keyword}%')
-                        )
-                    )
-        
-        results = query.all()
-        for auction, item in results:
-            matching_auctions.add((auction.id, item.id))
-    
-    # Format results
-    formatted_results = []
-    for auction_id, item_id in matching_auctions:
-        auction = Auction.query.get(auction_id)
-        item = Item.query.get(item_id)
-        if auction and item:
-            formatted_results.append({
-                'auction_id': auction.id,
-                'auction_title': item.name,
-                'category': item.category,
-                'current_price': auction.current_price,
-                'start_date': auction.start_time.isoformat() + 'Z',
-                'end_date': auction.end_time.isoformat() + 'Z',
-                'image_url': item.image_url
-            })
-    
-    return jsonify({'data': formatted_results})
+    user_id = request.user.id
+    # Cached until an auction opens or closes, or one of this user's alerts changes or has
+    # its price range crossed by a bid (notify_price_crossings); prices shown may lag by the TTL
+    matches = response_cache.memoize(f'alert-matches:{user_id}', [AUCTION_SET, f'alerts:{user_id}'],
+                                      lambda: _find_matches(user_id))
+    return jsonify({'data': matches})
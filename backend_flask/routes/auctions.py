@@ -1,62 +1,148 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, Auction, Item, User, Bid
 from routes.auth import protect
+from services.auction_service import add_participant
+from services.alert_percolator import notify_matching_alerts
+from services.auction_listing import listing_query, fetch_listing, stream_listing
+from services.streaming import stream_format, stream_response
+from services.search import apply_keyword_search
+from services.facets import cached_facets
+from services.response_cache import cached, conditional, response_cache, invalidate_auction, AUCTION_SET, AUCTION_BIDS
+from services.concurrency import retry_on_conflict
+from sqlalchemy.orm.exc import StaleDataError
+from services.pagination import encode_cursor, decode_cursor, keyset_after, parse_limit, estimate_count, InvalidCursor
 from datetime import datetime
 
 auctions_bp = Blueprint('auctions', __name__)
 
 @auctions_bp.route('/', methods=['GET'])
+@cached(AUCTION_SET, AUCTION_BIDS)
 def get_auctions():
     # Filters
     keyword = request.args.get('keyword')
     min_price = request.args.get('min_price')
     max_price = request.args.get('max_price')
     category = request.args.get('category')
+    subcategory = request.args.get('subcategory')
     sort = request.args.get('sort')
+    if category == 'All':
+        category = None
     
-    query = Auction.query
+    # Item is joined up front and only the serialized columns are selected
+    query = listing_query()
     
-    # Keyword search (Title or Description) via Item join
+    # Keyword search: full-text index over name, description and categories when available
+    relevance = None
     if keyword:
-        query = query.join(Item).filter(
-            (Item.name.ilike(f'%{keyword}%')) | 
-            (Item.description.ilike(f'%{keyword}%'))
-        )
+        query, relevance = apply_keyword_search(query, keyword)
+        if relevance is not None:
+            query = query.add_columns(relevance.label('relevance'))
     
-    # Category filter
-    if category and category != 'All':
-        if not keyword: # If not already joined
-             query = query.join(Item)
-        query = query.filter(Item.category == category)
-        
     # Price filter
     if min_price:
         query = query.filter(Auction.current_price >= float(min_price))
     if max_price:
         query = query.filter(Auction.current_price <= float(max_price))
 
-    # Sorting
-    if sort:
-        if sort == 'price_asc':
-            query = query.order_by(Auction.current_price.asc())
-        elif sort == 'price_desc':
-             query = query.order_by(Auction.current_price.desc())
-        elif sort == 'date_asc':
-             query = query.order_by(Auction.end_time.asc())
-        elif sort == 'date_desc':
-             query = query.order_by(Auction.end_time.desc())
+    # ?facets=true: counts next to the results, from the filters so far (facets are per category)
+    facets = None
+    if request.args.get('facets') == 'true':
+        signature = {'keyword': keyword, 'min_price': min_price, 'max_price': max_price,
+                     'category': category, 'subcategory': subcategory}
+        facets = cached_facets(query, signature, category, subcategory)
+
+    # Category filter
+    if category:
+        query = query.filter(Item.category == category)
+    if subcategory:
+        query = query.filter(Item.subcategory == subcategory)
+
+    # Sorting: each mode is (column, descending), with id as the keyset tie-break
+    if sort == 'relevance' and relevance is not None:
+        sort_key, descending = relevance, True
     else:
-        query = query.order_by(Auction.start_time.desc()) # Default
-        
-    auctions = query.all()
-    # Serialize. to_dict() handles relationship loading
-    return jsonify({'data': [a.to_dict() for a in auctions]})
+        sort_key, descending = SORT_MODES.get(sort, SORT_MODES[None])
+    if descending:
+        query = query.order_by(sort_key.desc(), Auction.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), Auction.id.asc())
+
+    # Bulk export: ?format=ndjson or ?format=stream sends every matching row as it is read
+    fmt = stream_format()
+    if fmt:
+        return stream_response(stream_listing(query), fmt)
+
+    # Without ?limit= the whole result is returned, as before
+    if not request.args.get('limit'):
+        response = {'data': fetch_listing(query)}
+        if facets is not None:
+            response['facets'] = facets
+        return jsonify(response)
+
+    # Keyset pagination: ?cursor= continues after the last (sort_key, id) of the previous page
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+    page_query = query
+    if request.args.get('cursor'):
+        try:
+            value, last_id = decode_cursor(request.args['cursor'], 2)
+            if isinstance(sort_key.type, db.DateTime):
+                value = datetime.fromisoformat(value)
+        except (InvalidCursor, TypeError, ValueError):
+            return jsonify({'message': 'Invalid cursor'}), 400
+        page_query = query.filter(keyset_after([sort_key, Auction.id], [value, last_id], descending))
+
+    data = fetch_listing(page_query.limit(limit + 1))
+    response = {'data': data[:limit], 'next_cursor': None}
+    if facets is not None:
+        response['facets'] = facets
+    if len(data) > limit:
+        last = data[limit - 1]
+        value = last['relevance'] if sort_key is relevance else _sort_value(last, sort_key)
+        response['next_cursor'] = encode_cursor([value, last['auction_id']])
+
+    # ?count=estimate (cheap, possibly approximate) or ?count=exact (full COUNT)
+    count_mode = request.args.get('count')
+    filtered = bool(keyword or category or subcategory or min_price or max_price)
+    if count_mode == 'exact':
+        response['total'] = query.order_by(None).count()
+        response['total_is_exact'] = True
+    elif count_mode == 'estimate':
+        response['total'], response['total_is_exact'] = estimate_count(query, Auction.__table__, filtered)
+    return jsonify(response)
+
+# sort param -> (sort column, descending); None is the default order.
+# sort=relevance is handled in get_auctions, since it only exists for keyword searches.
+SORT_MODES = {
+    None: (Auction.start_time, True),
+    'price_asc': (Auction.current_price, False),
+    'price_desc': (Auction.current_price, True),
+    'date_asc': (Auction.end_time, False),
+    'date_desc': (Auction.end_time, True),
+    'bids_desc': (Auction.bid_count, True)
+}
+
+def _sort_value(row, sort_key):
+    """The cursor value of a serialized listing row for the given sort column."""
+    if sort_key is Auction.current_price:
+        return row['current_price']
+    if sort_key is Auction.bid_count:
+        return row['bid_count']
+    if sort_key is Auction.end_time:
+        return row['end_date'].rstrip('Z')
+    return row['start_date'].rstrip('Z')
+
+def _auction_etag(id):
+    """Auction.version bumps on every bid, edit, close and new participant."""
+    version = db.session.execute(db.select(Auction.version).where(Auction.id == id)).scalar()
+    return f'auction-{id}-v{version}' if version is not None else None
 
 @auctions_bp.route('/<int:id>', methods=['GET'])
+@conditional(_auction_etag)
+@cached('auction:{id}')
 def get_auction_by_id(id):
-    auction = Auction.query.get(id)
-    if auction:
-        return jsonify({'data': auction.to_dict()})
+    auctions = fetch_listing(listing_query().filter(Auction.id == id))
+    if auctions:
+        return jsonify({'data': auctions[0]})
     return jsonify({'message': 'Auction not found'}), 404
 
 @auctions_bp.route('/', methods=['POST'])
@@ -105,7 +191,14 @@ def create_auction():
             # winner_id is None
         )
         db.session.add(new_auction)
+        db.session.flush()
+        notify_matching_alerts(new_item, new_auction)
+        response_cache.invalidate(AUCTION_SET, 'items')
         db.session.commit()
+
+        closer = current_app.extensions.get('auction_closer')
+        if closer:
+            closer.schedule(new_auction.id, new_auction.end_time)
         
         return jsonify({'data': new_auction.to_dict()}), 201
         
@@ -128,6 +221,7 @@ def update_auction(id):
     # Update logic... simplified for brevity
     # TODO: Implement update fields
     
+    invalidate_auction(auction.id, auction.item_id)
     db.session.commit()
     return jsonify({'data': auction.to_dict()})
 
@@ -146,24 +240,32 @@ def delete_auction(id):
     if auction.item:
         db.session.delete(auction.item)
         
+    invalidate_auction(auction.id, auction.item_id, membership=True)
     db.session.commit()
     return jsonify({'message': 'Auction removed'})
 
 @auctions_bp.route('/participate/<int:id>', methods=['POST'])
 @protect
 def participate_auction(id):
-    auction = Auction.query.get(id)
+    # The participant counter is versioned; a bid landing at the same moment means re-reading and retrying
+    try:
+        body, status = retry_on_conflict(_participate, id, request.user.id)
+    except StaleDataError:
+        return jsonify({'message': 'Auction is busy, please try again'}), 409
+    return jsonify(body), status
+
+def _participate(auction_id, user_id):
+    """One attempt at registering a participant; the caller commits."""
+    auction = Auction.query.get(auction_id)
     if not auction:
-        return jsonify({'message': 'Auction not found'}), 404
-        
-    # Check if already participating
-    if request.user in auction.participants:
-         return jsonify({'message': 'Already participating'}), 200
-         
-    auction.participants.append(request.user)
-    db.session.commit()
-    
-    return jsonify({'message': 'Successfully registered for auction'})
+        return {'message': 'Auction not found'}, 404
+
+    # Check if already participating (insert-if-absent, no participant list load)
+    if not add_participant(auction, user_id):
+        return {'message': 'Already participating'}, 200
+
+    invalidate_auction(auction.id, auction.item_id, bids=True)
+    return {'message': 'Successfully registered for auction'}, 200
 
 # Get similar items (from preceding month)
 @auctions_bp.route('/similar/<int:auction_id>', methods=['GET'])
@@ -211,9 +313,6 @@ def get_similar_items(auction_id):
         
         similarity_score = (category_score * 0.5) + (price_score * 0.5)
         
-        # Count bids
-        bid_count = Bid.query.filter_by(auction_id=sim_auction.id).count()
-        
         results.append({
             'auction_id': sim_auction.id,
             'auction_title': sim_item.name,
@@ -221,7 +320,7 @@ def get_similar_items(auction_id):
             'subcategory': sim_item.subcategory,
             'current_price': sim_auction.current_price,
             'final_price': sim_auction.current_price,
-            'bid_count': bid_count,
+            'bid_count': sim_auction.bid_count,
             'start_date': sim_auction.start_time.isoformat() + 'Z',
             'end_date': sim_auction.end_time.isoformat() + 'Z',
             'status': 'active' if sim_auction.is_active else 'closed',
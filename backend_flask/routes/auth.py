@@ -4,43 +4,62 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 import datetime
 from functools import wraps
+from services.streaming import stream_format, stream_response, BATCH_SIZE
 
 auth_bp = Blueprint('auth', __name__)
 
-def generate_token(user_id):
+def generate_token(user_id, scope=None, lifetime=datetime.timedelta(days=30)):
+    """
+    A signed login token. With `scope`, a token good only for that one use
+    (e.g. 'events' for the live stream) and rejected everywhere else.
+    """
     payload = {
         'id': user_id,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=30)
+        'exp': datetime.datetime.utcnow() + lifetime
     }
+    if scope:
+        payload['scope'] = scope
     return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
 
+def decode_token(token, scope=None):
+    """(claims, None) for a valid, unexpired token of this scope, else (None, error response)."""
+    if not token:
+        return None, (jsonify({'message': 'Not authorized, no token'}), 401)
+    try:
+        decoded = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({'message': 'Token expired'}), 401)
+    except jwt.InvalidTokenError:
+        return None, (jsonify({'message': 'Invalid token'}), 401)
+    if decoded.get('scope') != scope:
+        return None, (jsonify({'message': 'Invalid token'}), 401)
+    return decoded, None
+
+def authenticate(token, scope=None):
+    """(user, None) for a valid token of this scope, else (None, error response)."""
+    decoded, error = decode_token(token, scope)
+    if error:
+        return None, error
+    current_user = User.query.get(decoded['id'])
+    if not current_user:
+        return None, (jsonify({'message': 'User not found'}), 401)
+    return current_user, None
+
+def bearer_token():
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(" ")[1]
+    return None
+
 # Middleware to protect routes
 def protect(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(" ")[1]
-        
-        if not token:
-            return jsonify({'message': 'Not authorized, no token'}), 401
-        
-        try:
-            decoded = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(decoded['id'])
-            if not current_user:
-                return jsonify({'message': 'User not found'}), 401
-            # Add user to request context (handled differently in Flask usually, but passing via args or g)
-            # For simplicity, we can inspect g.user if we assigned it, but for now we trust the ID.
-            # Using custom attribute on request
-            request.user = current_user
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token'}), 401
-            
+        current_user, error = authenticate(bearer_token())
+        if error:
+            return error
+        # Using custom attribute on request
+        request.user = current_user
         return f(*args, **kwargs)
     return decorated
 
@@ -130,6 +149,12 @@ def get_users():
     if not request.user.is_admin and not request.user.is_rep:
         return jsonify({'message': 'Not authorized'}), 401
     
+    # ?format=ndjson / ?format=stream for bulk exports
+    fmt = stream_format()
+    if fmt:
+        users = User.query.order_by(User.id).yield_per(BATCH_SIZE)
+        return stream_response((u.to_dict() for u in users), fmt, envelope=None)
+
     users = User.query.all()
     return jsonify([u.to_dict() for u in users])
 
@@ -237,17 +262,13 @@ def get_my_auctions():
     
     auction_list = []
     for auction, item in auctions:
-        # Count bids for this auction
-        from models import Bid
-        bid_count = Bid.query.filter_by(auction_id=auction.id).count()
-        
         auction_list.append({
             'auction_id': auction.id,
             'auction_title': item.name,
             'category': item.category,
             'current_price': auction.current_price,
             'min_price': auction.min_price,
-            'bid_count': bid_count,
+            'bid_count': auction.bid_count,
             'start_date': auction.start_time.isoformat() + 'Z',
             'end_date': auction.end_time.isoformat() + 'Z',
             'status': 'active' if auction.is_active else 'closed',
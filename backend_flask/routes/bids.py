@@ -1,6 +1,18 @@
-from flask import Blueprint, request, jsonify
-from models import db, Bid, Item, Auction, User
+from flask import Blueprint, request, jsonify, current_app
+from models import db, Bid, Item, Auction, User, Notification
 from routes.auth import protect
+from services.proxy_bidding import resolve_proxy_bids, apply_proxy_bids
+from services.group_commit import BidWriteBuffer
+from services.auction_service import add_participant
+from services.bid_index import bid_index
+from services.alert_percolator import notify_price_crossings
+from services.event_broker import event_broker, publish_price, publish_notifications
+from services.response_cache import invalidate_auction, conditional
+from services.pagination import encode_cursor, decode_cursor, keyset_after, parse_limit, InvalidCursor
+from sqlalchemy import func, insert
+from services.concurrency import retry_on_conflict
+from sqlalchemy.orm.exc import StaleDataError
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 bids_bp = Blueprint('bids', __name__)
@@ -13,141 +25,207 @@ def place_bid(item_id):
     upper_limit = data.get('upper_limit')
     if upper_limit:
         upper_limit = float(upper_limit)
-        
+
+    # Hot auctions: hand the bid to the auction's single writer and wait
+    sequencer = current_app.extensions.get('bid_sequencer')
+    if sequencer:
+        user_id = request.user.id
+        future = sequencer.submit(item_id, _place_bid, item_id, user_id, amount, upper_limit,
+                                  on_lost=lambda: _bid_lost(item_id, user_id, amount))
+        try:
+            try:
+                body, status = future.result(timeout=current_app.config['BID_SEQUENCER_TIMEOUT'])
+            except FutureTimeoutError:
+                # Still queued: withdraw it, so a client retrying cannot place the bid twice
+                if future.cancel():
+                    return jsonify({'message': 'Auction is busy, your bid was not placed. Please try again'}), 503
+                # Already in a batch being written; its outcome is moments away
+                body, status = future.result()
+        except StaleDataError:
+            return jsonify({'message': 'Auction is busy, please place your bid again'}), 409
+        return jsonify(body), status
+
+    # Versioned compare-and-swap on the auction; re-validate and retry on conflict
+    try:
+        body, status = retry_on_conflict(_place_bid, item_id, request.user.id, amount, upper_limit)
+    except StaleDataError:
+        return jsonify({'message': 'Auction is busy, please place your bid again'}), 409
+    return jsonify(body), status
+
+def _place_bid(item_id, user_id, amount, upper_limit, buffer=None):
+    """One attempt at placing a bid. Returns (body, status); the caller commits.
+
+    Rejections return before anything is added to the session, which the
+    bid sequencer relies on to group-commit a batch of bids. Bid and
+    notification rows go to `buffer`; without one they are flushed here.
+    """
+    user = User.query.get(user_id)
     item = Item.query.get(item_id)
     if not item:
-        return jsonify({'message': 'Item not found'}), 404
+        return {'message': 'Item not found'}, 404
         
     auction = item.auction
     if not auction:
-        return jsonify({'message': 'Auction not found for this item'}), 404
+        return {'message': 'Auction not found for this item'}, 404
         
-    if item.seller_id == request.user.id:
-        return jsonify({'message': 'Seller cannot bid on their own item'}), 400
+    if item.seller_id == user.id:
+        return {'message': 'Seller cannot bid on their own item'}, 400
         
     if not auction.is_active or (auction.end_time < datetime.utcnow()):
-        return jsonify({'message': 'Auction is closed'}), 400
+        return {'message': 'Auction is closed'}, 400
         
     # Validate Amount
     # Using auction.current_price or auction.initial_price if 0
     min_bid = auction.current_price + (auction.increment or 1.0)
     if auction.current_price == 0:
         if amount < auction.initial_price:
-             return jsonify({'message': f'Bid must be at least start price {auction.initial_price}'}), 400
+             return {'message': f'Bid must be at least start price {auction.initial_price}'}, 400
     elif amount < min_bid:
-        return jsonify({'message': f'Bid must be at least {min_bid} (Current: {auction.current_price} + Increment: {auction.increment})'}), 400
+        return {'message': f'Bid must be at least {min_bid} (Current: {auction.current_price} + Increment: {auction.increment})'}, 400
         
-    # Check against current highest bid
-    # (Already checked by current_price sort of, but let's be safe)
-    
     # Identify previous winner to notify
     previous_winner_id = auction.winner_id
-    previous_high_bid = auction.current_price
+    previous_price = auction.current_price
+
+    own_buffer = buffer is None
+    if own_buffer:
+        buffer = BidWriteBuffer()
+    buffer.track(auction)
+    invalidate_auction(auction.id, item.id, bids=True)
 
     # Place Bid
-    new_bid = Bid(
+    buffer.add_bid(
         auction_id=auction.id,
-        bidder_id=request.user.id,
+        bidder_id=user.id,
         amount=amount,
         upper_limit=upper_limit,
         is_auto_bid=False, # Manual bid
         time=datetime.utcnow()
     )
-    db.session.add(new_bid)
     
     # Update Auction/Item Price
     auction.current_price = amount
-    auction.winner_id = request.user.id
+    auction.winner_id = user.id
     
     # Add to participants
-    if request.user not in auction.participants:
-        auction.participants.append(request.user)
-        
-    # Notify previous winner if they exist and are not the current bidder
-    if previous_winner_id and previous_winner_id != request.user.id:
-        from models import Notification
-        notification = Notification(
-            user_id=previous_winner_id,
+    add_participant(auction, user.id)
+
+    # Resolve Auto-Bidding against the standing proxy limits, same transaction
+    limits = buffer.limits_for(auction.id)
+    steps = resolve_proxy_bids(user.id, amount, limits, auction.increment or 1.0)
+    apply_proxy_bids(auction, steps, buffer)
+
+    # Notify everyone who lost the lead: the previous winner, the bidder if a
+    # proxy beat them straight away, and any proxy pushed to its limit on the way
+    outbid = {previous_winner_id, user.id} | {bidder_id for bidder_id, _, _ in steps}
+    outbid -= {None, auction.winner_id}
+    for outbid_id in sorted(outbid):
+        _publish_outbid(outbid_id, auction)
+        buffer.add_notification(
+            user_id=outbid_id,
             title='Outbid Alert',
-            description=f'You have been outbid on "{item.name}". The new price is ${amount}.',
+            description=f'You have been outbid on "{item.name}". The new price is ${auction.current_price}.',
             type='warning'
         )
-        db.session.add(notification)
 
-    db.session.commit()
-    
-    # Resolve Auto-Bidding
-    resolve_auto_bidding(auction.id, auction.increment or 1.0)
-    
-    return jsonify({
+    # Alerts whose price range the auction just moved into or out of
+    notify_price_crossings(item, auction, previous_price, buffer)
+    publish_price(auction)
+
+    if own_buffer:
+        buffer.flush()
+
+    return {
         'message': 'Bid placed',
         'current_price': auction.current_price
-    }), 201
-
-def resolve_auto_bidding(auction_id, increment):
-    active = True
-    while active:
-        # Get top 2 bids for this auction
-        bids = Bid.query.filter_by(auction_id=auction_id).order_by(Bid.amount.desc()).limit(2).all()
-        if len(bids) < 2:
-            break
-            
-        winner = bids[0]
-        loser = bids[1]
-        
-        # If loser has upper limit > winner amount
-        if loser.upper_limit and loser.upper_limit > winner.amount:
-            next_bid_amount = winner.amount + increment
-            
-            # Cap at upper limit
-            if next_bid_amount > loser.upper_limit:
-                next_bid_amount = loser.upper_limit
-            
-            # Only bid if it beats the winner (it should, unless limit reached)
-            if next_bid_amount > winner.amount:
-                # Loser fights back
-                new_auto_bid = Bid(
-                    auction_id=auction_id,
-                    bidder_id=loser.bidder_id,
-                    amount=next_bid_amount,
-                    upper_limit=loser.upper_limit,
-                    is_auto_bid=True,
-                    time=datetime.utcnow()
-                )
-                db.session.add(new_auto_bid)
-                
-                # Update Auction
-                auction = Auction.query.get(auction_id)
-                auction.current_price = next_bid_amount
-                auction.winner_id = loser.bidder_id
-                
-                db.session.commit()
-                continue # Loop
-        
-        active = False
+    }, 201
+
+def _bid_lost(item_id, user_id, amount):
+    """Tell a bidder that a bid acknowledged before it was written ('accept' durability) was not recorded."""
+    item = Item.query.get(item_id)
+    rows = [{
+        'user_id': user_id,
+        'title': 'Bid Not Placed',
+        'description': f'Your bid of ${amount} on "{item.name if item else "an item"}" could not be recorded. Please bid again.',
+        'type': 'error'
+    }]
+    db.session.execute(insert(Notification), rows)
+    publish_notifications(rows)
+    db.session.commit()
+
+def _publish_outbid(user_id, auction):
+    event_broker.publish_on_commit(f'user:{user_id}', 'outbid', {
+        'auction_id': auction.id,
+        'item_id': auction.item_id,
+        'current_price': auction.current_price
+    })
+
+def _bids_etag(item_id):
+    """Every bid added or removed updates the auction row, bumping Auction.version."""
+    version = db.session.execute(db.select(Auction.version).where(Auction.item_id == item_id)).scalar()
+    return f'bids-{item_id}-v{version}' if version is not None else None
 
 @bids_bp.route('/<int:item_id>', methods=['GET'])
+@conditional(_bids_etag)
 def get_bids_by_item(item_id):
-    # Need to find auction first? 
-    # Or just join.
-    # Bid has auction_id. Item has auction.
-    item = Item.query.get(item_id)
-    if not item or not item.auction:
+    """
+    Bid history for an item, newest first, one page at a time.
+
+    ?limit= caps the page (default 100). The X-Next-Cursor header is passed
+    back as ?cursor= for older bids; X-Latest-Cursor is passed back as
+    ?since= to fetch only bids newer than the ones already shown. Those come
+    oldest first, so a client further behind than one page catches up over
+    several calls instead of skipping the gap.
+    """
+    limit = parse_limit(request.args.get('limit'), default=100, maximum=500)
+    position = (datetime.fromisoformat, int)
+    try:
+        cursor = decode_cursor(request.args['cursor'], 2, position) if request.args.get('cursor') else None
+        since = decode_cursor(request.args['since'], 2, position) if request.args.get('since') else None
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
+
+    auction_id = db.session.query(Auction.id).filter(Auction.item_id == item_id).scalar()
+    if auction_id is None:
          return jsonify([])
-         
-    bids = Bid.query.filter_by(auction_id=item.auction.id).order_by(Bid.time.desc()).all()
+
+    # Bidder names come from the same query instead of one lazy User load per bid
+    query = db.session.query(Bid.id, Bid.amount, Bid.time, Bid.is_auto_bid, User.username)\
+        .outerjoin(User, Bid.bidder_id == User.id)\
+        .filter(Bid.auction_id == auction_id)
+    if cursor:
+        query = query.filter(keyset_after([Bid.time, Bid.id], cursor, descending=True))
+    if since:
+        # Page forward from the client's position
+        query = query.filter(keyset_after([Bid.time, Bid.id], since, descending=False))\
+            .order_by(Bid.time.asc(), Bid.id.asc())
+    else:
+        query = query.order_by(Bid.time.desc(), Bid.id.desc())
+    rows = query.limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    newest = (rows[-1] if since else rows[0]) if rows else None
     
     # Format
     result = []
-    for bid in bids:
+    for bid_id, amount, time, is_auto_bid, username in rows:
         result.append({
-            '_id': bid.id,
-            'amount': bid.amount,
-            'time': bid.time.isoformat(),
-            'bidder': bid.bidder.username if bid.bidder else 'Unknown',
-            'is_auto_bid': bid.is_auto_bid
+            '_id': bid_id,
+            'amount': amount,
+            'time': time.isoformat(),
+            'bidder': username or 'Unknown',
+            'is_auto_bid': is_auto_bid
         })
-    return jsonify(result)
+
+    response = jsonify(result)
+    if newest is not None:
+        response.headers['X-Latest-Cursor'] = encode_cursor([newest.time.isoformat(), newest.id])
+    elif since:
+        response.headers['X-Latest-Cursor'] = request.args['since']
+    if has_more and not since:
+        response.headers['X-Next-Cursor'] = encode_cursor([rows[-1].time.isoformat(), rows[-1].id])
+    return response
 
 # Remove/Delete a bid (Customer Rep / Admin only)
 @bids_bp.route('/<int:bid_id>', methods=['DELETE'])
@@ -157,40 +235,59 @@ def delete_bid(bid_id):
     if not request.user.is_rep and not request.user.is_admin:
         return jsonify({'message': 'Not authorized. Customer rep or admin access required.'}), 401
     
-    bid = Bid.query.get_or_404(bid_id)
+    try:
+        body = retry_on_conflict(_delete_bid, bid_id)
+    except StaleDataError:
+        return jsonify({'message': 'Auction is busy, please try again'}), 409
+    if isinstance(body, tuple):
+        return jsonify(body[0]), body[1]
+    return jsonify({'data': body})
+
+def _delete_bid(bid_id):
+    """One attempt at removing a bid and re-pricing its auction; the caller commits."""
+    bid = Bid.query.get(bid_id)
+    if not bid:
+        return {'message': 'Bid not found'}, 404
     auction = Auction.query.get(bid.auction_id)
     
     if not auction:
-        return jsonify({'message': 'Auction not found'}), 404
+        return {'message': 'Auction not found'}, 404
     
     # Store info before deleting
     deleted_bid_amount = bid.amount
+    previous_price = auction.current_price
     deleted_bidder = bid.bidder.username if bid.bidder else 'Unknown'
-    
-    # Delete the bid
+    base_version = auction.version
+    invalidate_auction(auction.id, auction.item_id, bids=True)
+
+    # Read everything without the bid first, so the delete and the auction's
+    # new state go out in one flush: one versioned UPDATE, one version bump
+    top = bid_index.record_delete(auction, base_version, bid)
+    last_bid_at = auction.last_bid_at
+    if last_bid_at is not None and bid.time is not None and bid.time >= last_bid_at:
+        last_bid_at = db.session.query(func.max(Bid.time)).filter(Bid.auction_id == auction.id, Bid.id != bid.id).scalar()
+
+    # The counter change always bumps the auction version, so other processes drop cached bids
     db.session.delete(bid)
-    
-    # Recalculate auction current price
-    remaining_bids = Bid.query.filter_by(auction_id=auction.id)\
-        .order_by(Bid.amount.desc()).all()
-    
-    if remaining_bids:
+    auction.bid_count = max((auction.bid_count or 0) - 1, 0)
+    auction.last_bid_at = last_bid_at
+
+    if top:
         # Set to highest remaining bid
-        auction.current_price = remaining_bids[0].amount
-        auction.winner_id = remaining_bids[0].bidder_id
+        auction.winner_id, auction.current_price = top
     else:
         # No bids left, reset to start price
-        item = Item.query.get(auction.item_id)
-        auction.current_price = item.start_price if item else auction.current_price
+        auction.current_price = auction.initial_price
         auction.winner_id = None
+
+    notify_price_crossings(auction.item, auction, previous_price)
+    publish_price(auction)
     
-    db.session.commit()
-    
-    return jsonify({'data': {
+    return {
         'message': 'Bid removed successfully',
         'deleted_bid_id': bid_id,
         'deleted_amount': deleted_bid_amount,
         'deleted_bidder': deleted_bidder,
         'new_current_price': auction.current_price
-    }})
+    }
 
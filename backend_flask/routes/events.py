@@ -0,0 +1,91 @@
+from flask import Blueprint, jsonify, request, current_app
+from models import db, User, Notification
+from routes.auth import protect, generate_token, decode_token
+from services.event_broker import event_broker
+import datetime
+import json
+import time
+
+events_bp = Blueprint('events', __name__)
+
+# Most auctions one connection may watch
+MAX_WATCHED = 50
+
+def _frame(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', 'data: ' + json.dumps(data, separators=(',', ':'))]
+    return '\n'.join(lines) + '\n\n'
+
+@events_bp.route('/token', methods=['POST'])
+@protect
+def stream_token():
+    """
+    A short-lived token for ?token= on the stream. EventSource cannot set
+    headers, and URLs end up in logs, so the login token never goes there:
+    this one is only accepted by the stream and expires in EVENTS_TOKEN_TTL
+    seconds.
+    """
+    ttl = current_app.config['EVENTS_TOKEN_TTL']
+    token = generate_token(request.user.id, scope='events', lifetime=datetime.timedelta(seconds=ttl))
+    return jsonify({'data': {'token': token, 'expires_in': ttl}})
+
+@events_bp.route('/', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events: the user's notifications and outbids, plus price and
+    close events for the auctions in ?auctions=1,2,3.
+
+    Authenticated by ?token= from POST /api/events/token. The stream ends
+    with an 'expired' event when that token expires; the client fetches a
+    new token and reconnects.
+    """
+    claims, error = decode_token(request.args.get('token'), scope='events')
+    if error:
+        return error
+    user = User.query.get(claims['id'])
+    if not user:
+        return jsonify({'message': 'User not found'}), 401
+    expires_at = claims['exp']
+
+    try:
+        auctions = sorted({int(a) for a in request.args.get('auctions', '').split(',') if a.strip()})
+    except ValueError:
+        return jsonify({'message': 'auctions must be a comma-separated list of ids'}), 400
+    if len(auctions) > MAX_WATCHED:
+        return jsonify({'message': f'At most {MAX_WATCHED} auctions per connection'}), 400
+
+    # Subscribe before reading the unread count, so nothing falls between the two
+    subscription = event_broker.subscribe([f'user:{user.id}'] + [f'auction:{a}' for a in auctions])
+    unread = Notification.query.filter_by(user_id=user.id, is_read=False).count()
+    # The stream never touches the database; give the connection back now
+    db.session.close()
+
+    heartbeat = current_app.config['EVENTS_HEARTBEAT']
+    retry_ms = current_app.config['EVENTS_RETRY_MS']
+
+    def events():
+        yield f'retry: {retry_ms}\n\n'
+        yield _frame('hello', {'unread': unread, 'auctions': auctions})
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                yield _frame('expired', {})
+                return
+            pending = subscription.wait(min(heartbeat, remaining))
+            if subscription.overflowed:
+                # Fell behind and lost events: the client should refetch what it shows
+                subscription.overflowed = False
+                yield _frame('resync', {})
+            if not pending:
+                # Comment line: keeps proxies from timing out an idle connection
+                yield ': keepalive\n\n'
+            for event_id, event, data in pending:
+                yield _frame(event, data, event_id)
+
+    response = current_app.response_class(events(), mimetype='text/event-stream')
+    # Runs when the client disconnects (or the server drops the response)
+    response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
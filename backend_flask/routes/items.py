@@ -1,24 +1,34 @@
 from flask import Blueprint, request, jsonify
 from models import db, Item, Auction
 from routes.auth import protect
+from services.response_cache import cached, response_cache
+from services.streaming import stream_format, stream_response, BATCH_SIZE
+from sqlalchemy.orm import joinedload
 
 items_bp = Blueprint('items', __name__)
 
 @items_bp.route('/', methods=['GET'])
+@cached('items')
 def get_all_items():
-    items = Item.query.all()
-    # Join with auction to get status?
-    result = []
-    for item in items:
-        data = item.to_dict()
-        # Optionally add auction status
-        if item.auction:
-            data['auction_status'] = 'active' if item.auction.is_active else 'closed'
-            data['current_price'] = item.auction.current_price
-        result.append(data)
-    return jsonify({'data': result})
+    # Auctions are joined in the same query rather than lazy-loaded per item
+    query = Item.query.options(joinedload(Item.auction))
+
+    fmt = stream_format()
+    if fmt:
+        return stream_response((_item_row(item) for item in query.yield_per(BATCH_SIZE)), fmt)
+
+    return jsonify({'data': [_item_row(item) for item in query.all()]})
+
+def _item_row(item):
+    data = item.to_dict()
+    # Optionally add auction status
+    if item.auction:
+        data['auction_status'] = 'active' if item.auction.is_active else 'closed'
+        data['current_price'] = item.auction.current_price
+    return data
 
 @items_bp.route('/<int:id>', methods=['GET'])
+@cached('item:{id}')
 def get_item_by_id(id):
     item = Item.query.get(id)
     if item:
@@ -38,6 +48,7 @@ def create_item():
         seller_id=request.user.id
     )
     db.session.add(new_item)
+    response_cache.invalidate('items')
     db.session.commit()
     return jsonify({'data': new_item.to_dict()}), 201
 
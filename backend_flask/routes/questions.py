@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from models import db, Question, User
 from routes.auth import protect
+from services.streaming import stream_format, stream_response, BATCH_SIZE
+from sqlalchemy.orm import joinedload
 
 questions_bp = Blueprint('questions', __name__)
 
@@ -26,8 +28,15 @@ def create_question():
 @questions_bp.route('/', methods=['GET'])
 def get_all_questions():
     """Get all questions (for customer reps)"""
-    questions = Question.query.order_by(Question.timestamp.desc()).all()
-    return jsonify({'data': [q.to_dict() for q in questions]})
+    query = Question.query.options(joinedload(Question.asker), joinedload(Question.responder))\
+        .order_by(Question.timestamp.desc())
+
+    # ?format=ndjson / ?format=stream for bulk exports
+    fmt = stream_format()
+    if fmt:
+        return stream_response((q.to_dict() for q in query.yield_per(BATCH_SIZE)), fmt)
+
+    return jsonify({'data': [q.to_dict() for q in query.all()]})
 
 @questions_bp.route('/unanswered', methods=['GET'])
 @protect
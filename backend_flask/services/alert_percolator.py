@@ -0,0 +1,320 @@
+from models import db, Alert, Notification
+from services.interval_index import IntervalIndex
+from services.text_tokens import keyword_tokens, index_terms
+from services.tx_hooks import on_commit
+from services.event_broker import publish_notifications
+from services.response_cache import response_cache
+from sqlalchemy import insert
+from collections import OrderedDict
+import threading
+import time
+
+class _Alert:
+    """What matching needs from an Alert row, detached from the session."""
+
+    __slots__ = ('id', 'user_id', 'tokens', 'category', 'min_price', 'max_price')
+
+    def __init__(self, alert):
+        self.id = alert.id
+        self.user_id = alert.user_id
+        self.tokens = frozenset(keyword_tokens(alert.keywords))
+        self.category = alert.category or None
+        # A price bound of 0 meant "no bound" to the old matcher as well
+        self.min_price = alert.min_price or None
+        self.max_price = alert.max_price or None
+
+    @property
+    def priced(self):
+        return self.min_price is not None or self.max_price is not None
+
+    def accepts(self, terms, category, price):
+        if self.category and self.category != category:
+            return False
+        if self.min_price is not None and price < self.min_price:
+            return False
+        if self.max_price is not None and price > self.max_price:
+            return False
+        return self.tokens <= terms
+
+class AlertPercolator:
+    """
+    Matches one new auction against every active alert at once.
+
+    Alerts are indexed the other way round from a search: an alert with
+    keywords is filed under a single anchor token (its longest, usually
+    the rarest), so only alerts whose anchor occurs in the item's text are
+    even looked at; the remaining tokens, category and price are checked
+    on those candidates. Alerts without keywords sit in one price
+    interval index per category (plus one for "any category"), answered
+    by a stabbing query at the auction's price. Either way the work grows
+    with the number of candidate alerts, not the number of alerts.
+
+    Price changes on a live auction are checked against a second interval
+    index per category holding every alert with a price bound: a crossing
+    query returns just the alerts whose range the auction has moved into or
+    out of. A user is in range while any of their alerts is; what was last
+    announced to each user about each auction is remembered, so nobody hears
+    the same thing twice in a row.
+
+    The index is built from the alerts table when the app is created
+    (init_app) and kept current by alert writes in this process. Serving
+    processes also call start(), which rebuilds it every `refresh_interval`
+    seconds on a background thread to pick up writes from other processes;
+    requests never read the table.
+    Alert writes committed while a rebuild is reading are replayed onto the
+    new index, so none are lost to it.
+    """
+
+    def __init__(self, refresh_interval=60, remember=100000):
+        self.refresh_interval = refresh_interval
+        self.remember = remember
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._replay = None     # alert writes applied while a rebuild reads, or None
+        self._alerts = {}
+        self._by_anchor = {}    # token -> {alert_id}
+        self._by_price = {}     # category or None -> IntervalIndex of keywordless alerts
+        self._by_range = {}     # category or None -> IntervalIndex of alerts with a price bound
+        self._by_user = {}      # user_id -> {alert_id} of alerts with a price bound
+        self._announced = OrderedDict()  # (user_id, auction_id) -> last announced "in range", LRU
+        self._built_at = None
+        self.matched = 0
+        self.candidates = 0
+        self.crossings = 0
+
+    def init_app(self, app):
+        """Build the index for a new app, if its database has the alerts table yet."""
+        self.refresh_interval = app.config['ALERT_INDEX_REFRESH']
+        with app.app_context():
+            if db.inspect(db.engine).has_table(Alert.__tablename__):
+                self.rebuild()
+            db.session.remove()
+
+    def start(self, app):
+        """Refresh the index in the background every `refresh_interval` seconds (building it first if init_app could not)."""
+        if self._thread is not None:
+            return
+        if self._built_at is None:
+            with app.app_context():
+                self.rebuild()
+                db.session.remove()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(app,), daemon=True, name='alert-percolator')
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self, app):
+        with app.app_context():
+            while not self._stopped.wait(self.refresh_interval):
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    app.logger.error(f'Alert index refresh failed: {e}')
+                finally:
+                    db.session.remove()
+
+    def rebuild(self):
+        """Reload every active alert: one full read of the table, outside the lock."""
+        with self._lock:
+            self._replay = []
+        try:
+            entries = [_Alert(alert) for alert in Alert.query.filter_by(is_active=True).all()]
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self._alerts, self._by_anchor, self._by_price, self._by_range, self._by_user = {}, {}, {}, {}, {}
+            for entry in entries:
+                self._add(entry)
+            # Writes committed after the read started may be missing from it; applying twice is harmless
+            for apply in replay:
+                apply()
+            self._built_at = time.monotonic()
+
+    def _apply(self, apply):
+        """Run an index change now, and again on the index a running rebuild is about to install."""
+        with self._lock:
+            apply()
+            if self._replay is not None:
+                self._replay.append(apply)
+
+    def clear(self):
+        """Forget every alert and announcement, until init_app(), start() or rebuild() loads the table again."""
+        with self._lock:
+            self._alerts, self._by_anchor, self._by_price, self._by_range, self._by_user = {}, {}, {}, {}, {}
+            self._announced.clear()
+            self._built_at = None
+            self.matched = self.candidates = self.crossings = 0
+
+    def _add(self, entry):
+        self._remove(entry.id)
+        self._alerts[entry.id] = entry
+        if entry.tokens:
+            anchor = max(entry.tokens, key=lambda t: (len(t), t))
+            self._by_anchor.setdefault(anchor, set()).add(entry.id)
+        else:
+            self._by_price.setdefault(entry.category, IntervalIndex()).add(entry.id, entry.min_price, entry.max_price)
+        if entry.priced:
+            self._by_range.setdefault(entry.category, IntervalIndex()).add(entry.id, entry.min_price, entry.max_price)
+            self._by_user.setdefault(entry.user_id, set()).add(entry.id)
+
+    def _remove(self, alert_id):
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return
+        if entry.tokens:
+            anchor = max(entry.tokens, key=lambda t: (len(t), t))
+            self._by_anchor.get(anchor, set()).discard(alert_id)
+        else:
+            self._by_price[entry.category].remove(alert_id)
+        if entry.priced:
+            self._by_range[entry.category].remove(alert_id)
+            self._by_user[entry.user_id].discard(alert_id)
+
+    def track(self, alert):
+        """Pick up a created or edited alert once the current transaction commits."""
+        db.session.flush()
+        entry = _Alert(alert)
+        active = alert.is_active
+
+        def apply():
+            if active:
+                self._add(entry)
+            else:
+                self._remove(entry.id)
+        on_commit(lambda: self._apply(apply))
+
+    def untrack(self, alert_id):
+        on_commit(lambda: self._apply(lambda: self._remove(alert_id)))
+
+    def match(self, name, description, category, price):
+        """The active alerts (as _Alert) matching an item with this text, category and price."""
+        terms = index_terms(name, description)
+        with self._lock:
+            candidates = set()
+            for term in terms:
+                candidates.update(self._by_anchor.get(term, ()))
+            for bucket in (None, category):
+                index = self._by_price.get(bucket)
+                if index is not None:
+                    candidates.update(index.stab(price))
+            matches = [self._alerts[i] for i in candidates if self._alerts[i].accepts(terms, category, price)]
+            self.candidates += len(candidates)
+            self.matched += len(matches)
+        return matches
+
+    def crossed(self, auction_id, name, description, category, old_price, new_price, pending=None):
+        """
+        [(user_id, in_range)] for the users whose alerts the auction's price
+        just moved into (True) or out of (False), minus what they were last told.
+        `pending` maps (user_id, auction_id) to what the current transaction has
+        already told them and takes precedence over the committed state.
+        Runs inside bid transactions, so it only ever reads the in-memory index.
+        """
+        with self._lock:
+            entered, left = set(), set()
+            for bucket in (None, category):
+                index = self._by_range.get(bucket)
+                if index is not None:
+                    moved_in, moved_out = index.crossing(old_price, new_price)
+                    entered.update(moved_in)
+                    left.update(moved_out)
+            if not entered and not left:
+                return []
+            terms = index_terms(name, description)
+            users_in = {self._alerts[i].user_id for i in entered if self._alerts[i].tokens <= terms}
+            users_out = {self._alerts[i].user_id for i in left if self._alerts[i].tokens <= terms} - users_in
+            # Leaving one range is no news while another of the user's alerts still matches
+            users_out = {user_id for user_id in users_out if not any(
+                self._alerts[i].accepts(terms, category, new_price) for i in self._by_user.get(user_id, ()))}
+            pending = pending or {}
+            return [(user_id, inside) for inside, users in ((True, users_in), (False, users_out))
+                    for user_id in sorted(users)
+                    if pending.get((user_id, auction_id), self._announced.get((user_id, auction_id))) is not inside]
+
+    def announce(self, auction_id, crossed):
+        """Remember what `crossed` told users, once the current transaction commits."""
+        def apply():
+            with self._lock:
+                for user_id, inside in crossed:
+                    key = (user_id, auction_id)
+                    self._announced[key] = inside
+                    self._announced.move_to_end(key)
+                while len(self._announced) > self.remember:
+                    self._announced.popitem(last=False)
+                self.crossings += len(crossed)
+        on_commit(apply)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'alerts': len(self._alerts),
+                # Seconds since the last full load; None until start() (only this process's writes are indexed)
+                'age': round(time.monotonic() - self._built_at, 1) if self._built_at is not None else None,
+                'anchors': len(self._by_anchor),
+                'candidates': self.candidates,
+                'matched': self.matched,
+                'crossings': self.crossings
+            }
+
+alert_percolator = AlertPercolator()
+
+def notify_matching_alerts(item, auction):
+    """
+    Queue one 'Alert Match' notification per user with an alert matching a new
+    auction (never the seller), in the caller's transaction. Returns how many.
+    """
+    matches = alert_percolator.match(item.name, item.description, item.category, auction.current_price)
+    users = sorted({alert.user_id for alert in matches} - {item.seller_id})
+    if users:
+        rows = [{
+            'user_id': user_id,
+            'title': 'Alert Match',
+            'description': f'A new auction matches your alert: "{item.name}" starting at ${auction.current_price}.',
+            'type': 'info'
+        } for user_id in users]
+        db.session.execute(insert(Notification), rows)
+        publish_notifications(rows)
+    return len(users)
+
+def notify_price_crossings(item, auction, old_price, buffer=None):
+    """
+    Tell users whose alert range the auction's price just moved into or out
+    of, once each. With a BidWriteBuffer the rows are queued in it, and what
+    they say is recorded there too, so later bids of the same batch do not
+    repeat them before the commit; without one the rows are inserted here.
+    Their cached alert matches (tagged 'alerts:<user>') gained or lost the
+    auction, so they are dropped too.
+    """
+    if old_price == auction.current_price:
+        return 0
+    crossed = alert_percolator.crossed(
+        auction.id, item.name, item.description, item.category, old_price, auction.current_price,
+        pending=buffer.announced if buffer is not None else None)
+    if crossed:
+        response_cache.invalidate(*[f'alerts:{user_id}' for user_id, _ in crossed])
+    crossed = [(user_id, inside) for user_id, inside in crossed if user_id != item.seller_id]
+    if not crossed:
+        return 0
+    rows = [{
+        'user_id': user_id,
+        'title': 'Price Alert',
+        'description': f'"{item.name}" is now ${auction.current_price}, '
+                       f'{"within" if inside else "outside"} your alert price range.',
+        'type': 'info'
+    } for user_id, inside in crossed]
+    if buffer is not None:
+        for row in rows:
+            buffer.add_notification(**row)
+        for user_id, inside in crossed:
+            buffer.announced[(user_id, auction.id)] = inside
+    else:
+        db.session.execute(insert(Notification), rows)
+        publish_notifications(rows)
+    alert_percolator.announce(auction.id, crossed)
+    return len(crossed)
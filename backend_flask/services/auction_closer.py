@@ -0,0 +1,256 @@
+from models import db, Auction, Item, Notification
+from services.response_cache import invalidate_auction
+from services.event_broker import event_broker, publish_notifications
+from sqlalchemy import insert
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime, timedelta, timezone
+import heapq
+import threading
+import time
+
+def _naive_utc(value):
+    """End times are stored as naive UTC; incoming values may carry a timezone."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def settle_auctions(auction_ids, now=None):
+    """
+    Close the given auctions if they have ended, deciding each winner against the reserve.
+
+    Auctions already closed or not yet ended are skipped. Winner and seller
+    notifications are written with one executemany INSERT. Commits once and
+    returns the ids that were closed; a bid racing the close makes the
+    versioned UPDATE fail and the caller retries on the next tick.
+    """
+    now = now or datetime.utcnow()
+    rows = db.session.query(Auction, Item.name, Item.seller_id)\
+        .join(Item, Auction.item_id == Item.id)\
+        .filter(Auction.id.in_(auction_ids))\
+        .filter(Auction.is_active == True)\
+        .filter(Auction.end_time <= now)\
+        .all()
+
+    notifications = []
+    closed = []
+    for auction, item_name, seller_id in rows:
+        reserve_met = auction.min_price is None or auction.current_price >= auction.min_price
+        auction.is_active = False
+        closed.append(auction.id)
+        invalidate_auction(auction.id, auction.item_id, membership=True)
+        event_broker.publish_on_commit(f'auction:{auction.id}', 'closed', {
+            'auction_id': auction.id,
+            'item_id': auction.item_id,
+            'current_price': auction.current_price,
+            'sold': bool(auction.winner_id and reserve_met)
+        })
+
+        if auction.winner_id and reserve_met:
+            notifications.append({
+                'user_id': auction.winner_id,
+                'title': 'Auction Won',
+                'description': f'You won "{item_name}" for ${auction.current_price}.',
+                'type': 'success'
+            })
+            notifications.append({
+                'user_id': seller_id,
+                'title': 'Auction Sold',
+                'description': f'"{item_name}" sold for ${auction.current_price}.',
+                'type': 'success'
+            })
+        elif auction.winner_id:
+            # Highest bid stayed under the secret reserve: nobody wins
+            notifications.append({
+                'user_id': auction.winner_id,
+                'title': 'Auction Ended',
+                'description': f'The reserve price for "{item_name}" was not met, so the item was not sold.',
+                'type': 'info'
+            })
+            notifications.append({
+                'user_id': seller_id,
+                'title': 'Reserve Not Met',
+                'description': f'"{item_name}" ended at ${auction.current_price}, below your reserve of ${auction.min_price}.',
+                'type': 'warning'
+            })
+            auction.winner_id = None
+        else:
+            notifications.append({
+                'user_id': seller_id,
+                'title': 'Auction Ended',
+                'description': f'"{item_name}" ended without any bids.',
+                'type': 'info'
+            })
+
+    if notifications:
+        db.session.execute(insert(Notification), notifications)
+        publish_notifications(notifications)
+    db.session.commit()
+    return closed
+
+class AuctionCloser:
+    """
+    Background scheduler that closes auctions when their end time passes.
+
+    Upcoming end times within `horizon` are kept in a min-heap and the worker
+    sleeps until the earliest one is due. Auctions scheduled in this process
+    close on time; the horizon is re-scanned every `scan_interval` seconds,
+    which bounds the lag for auctions created by other processes. On start,
+    and on every re-scan, overdue auctions are closed in batches of `batch_size` with one
+    short transaction each, so a backlog after downtime never holds the
+    auctions table for long.
+
+    With a LeaderLease only the process holding the lease does any of this;
+    the others keep trying to take it over and rebuild the heap when they do.
+    """
+
+    def __init__(self, app, lease=None, horizon=3600, scan_interval=30, max_lag=1.0, batch_size=200):
+        self.app = app
+        self.lease = lease
+        self._leading = False
+        self.horizon = timedelta(seconds=horizon)
+        self.scan_interval = min(scan_interval, horizon / 2)
+        self.max_lag = max_lag
+        self.batch_size = batch_size
+        self._heap = []
+        self._scheduled = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._next_scan = 0.0
+        self.closed = 0
+        self.conflicts = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='auction-closer')
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def schedule(self, auction_id, end_time):
+        """Track a new or rescheduled auction; far-off end times are left to the next scan."""
+        end_time = _naive_utc(end_time)
+        if end_time > datetime.utcnow() + self.horizon:
+            return
+        with self._cond:
+            if auction_id not in self._scheduled:
+                self._scheduled.add(auction_id)
+                heapq.heappush(self._heap, (end_time, auction_id))
+                self._cond.notify()
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stopped:
+                try:
+                    if self._lead():
+                        if time.monotonic() >= self._next_scan:
+                            self.catch_up()
+                            self._scan_horizon()
+                        self._close_due()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f'Auction closer tick failed: {e}')
+                    time.sleep(self.max_lag)
+                finally:
+                    db.session.remove()
+                self._wait()
+            if self.lease:
+                self.lease.release()
+                db.session.remove()
+
+    def _lead(self):
+        """Without a lease every process closes; with one, only the current leader does."""
+        if self.lease is None:
+            return True
+        leading = self.lease.ensure()
+        if leading and not self._leading:
+            # Just took over: the heap may be stale, so rebuild it from the database now
+            self._next_scan = 0.0
+        self._leading = leading
+        return leading
+
+    def _wait(self):
+        with self._cond:
+            if self._stopped:
+                return
+            timeout = self._next_scan - time.monotonic()
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            if self.lease:
+                timeout = min(timeout, self.lease.renew_interval) if self._leading else self.lease.renew_interval
+            if timeout > 0:
+                self._cond.wait(timeout=timeout)
+
+    def _scan_horizon(self):
+        now = datetime.utcnow()
+        upcoming = db.session.query(Auction.id, Auction.end_time)\
+            .filter(Auction.is_active == True)\
+            .filter(Auction.end_time > now)\
+            .filter(Auction.end_time <= now + self.horizon)\
+            .all()
+        for auction_id, end_time in upcoming:
+            self.schedule(auction_id, end_time)
+        self._next_scan = time.monotonic() + self.scan_interval
+
+    def _close_due(self):
+        now = datetime.utcnow()
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                end_time, auction_id = heapq.heappop(self._heap)
+                self._scheduled.discard(auction_id)
+                due.append((end_time, auction_id))
+        if due:
+            self._settle([auction_id for _, auction_id in due], due)
+
+    def catch_up(self):
+        """Close every overdue auction in batches; returns how many were closed."""
+        total = 0
+        while True:
+            ids = [row[0] for row in db.session.query(Auction.id)
+                   .filter(Auction.is_active == True)
+                   .filter(Auction.end_time <= datetime.utcnow())
+                   .order_by(Auction.end_time)
+                   .limit(self.batch_size)
+                   .all()]
+            if not ids:
+                return total
+            closed = self._settle(ids)
+            if closed is None:
+                continue
+            total += len(closed)
+            if not closed:
+                return total
+            # Let request threads at the table between batches
+            time.sleep(0)
+
+    def _settle(self, ids, requeue=None):
+        """settle_auctions with conflict handling; returns the closed ids, or None on conflict."""
+        try:
+            closed = settle_auctions(ids)
+        except StaleDataError:
+            # A bid landed at the same moment; try again shortly
+            db.session.rollback()
+            self.conflicts += 1
+            with self._cond:
+                for end_time, auction_id in (requeue or []):
+                    if auction_id not in self._scheduled:
+                        self._scheduled.add(auction_id)
+                        heapq.heappush(self._heap, (end_time, auction_id))
+            time.sleep(self.max_lag)
+            return None
+        self.closed += len(closed)
+        return closed
+
+    def to_dict(self):
+        with self._cond:
+            return {
+                'leader': self.lease.to_dict() if self.lease else None,
+                'scheduled': len(self._heap),
+                'next_end_time': self._heap[0][0].isoformat() + 'Z' if self._heap else None,
+                'closed': self.closed,
+                'conflicts': self.conflicts
+            }
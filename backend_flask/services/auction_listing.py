@@ -0,0 +1,94 @@
+from models import db, Auction, Item, User, auction_participants
+
+# The columns Auction.to_dict() serializes, plus the denormalized counters
+LISTING_COLUMNS = (
+    Auction.id,
+    Auction.item_id,
+    Auction.current_price,
+    Auction.start_time,
+    Auction.end_time,
+    Auction.is_active,
+    Auction.winner_id,
+    Auction.bid_count,
+    Auction.participant_count,
+    Auction.last_bid_at,
+    Item.name,
+    Item.description,
+    Item.image_url,
+    Item.category
+)
+
+def listing_query():
+    """Auctions with their item joined, projected to the listing columns. Filter on Auction/Item."""
+    return db.session.query(*LISTING_COLUMNS).select_from(Auction).outerjoin(Item, Auction.item_id == Item.id)
+
+def participant_names(auction_ids):
+    """{auction_id: [username, ...]} for the given auctions, e.g. the ids of a page already fetched."""
+    rows = db.session.query(auction_participants.c.auction_id, User.username)\
+        .join(User, User.id == auction_participants.c.user_id)\
+        .filter(auction_participants.c.auction_id.in_(auction_ids))\
+        .all()
+    names = {}
+    for auction_id, username in rows:
+        names.setdefault(auction_id, []).append(username)
+    return names
+
+def serialize_row(row, participants):
+    """Same shape as Auction.to_dict(), plus the counters (and relevance for keyword searches)."""
+    data = {
+        'auction_id': row.id,
+        'auction_title': row.name if row.name is not None else "Unknown",
+        'auction_desc': row.description if row.name is not None else "",
+        'image_url': row.image_url,
+        'category': row.category if row.name is not None else "",
+        'item_id': row.item_id,
+        'current_price': row.current_price,
+        'start_date': row.start_time.isoformat() + 'Z',
+        'end_date': row.end_time.isoformat() + 'Z',
+        'is_active': row.is_active,
+        'winner_id': row.winner_id,
+        'participants': participants,
+        'participant_count': row.participant_count,
+        'bid_count': row.bid_count,
+        'last_bid_at': row.last_bid_at.isoformat() + 'Z' if row.last_bid_at else None
+    }
+    if 'relevance' in row._fields:
+        data['relevance'] = row.relevance
+    return data
+
+def stream_listing(query, batch=500):
+    """
+    Serialize a listing_query() one row at a time, for streamed exports.
+
+    Rows come through a server-side cursor in batches of `batch`; participant
+    names are looked up per batch on a second connection, since MySQL cannot
+    run another statement on a connection with an unfinished streamed result.
+    """
+    pending = []
+    with db.engine.connect() as side:
+        for row in query.yield_per(batch):
+            pending.append(row)
+            if len(pending) == batch:
+                yield from _serialize_batch(side, pending)
+                pending = []
+        yield from _serialize_batch(side, pending)
+
+def _serialize_batch(connection, rows):
+    if not rows:
+        return
+    names = {}
+    found = connection.execute(
+        db.select(auction_participants.c.auction_id, User.username)
+        .join(User, User.id == auction_participants.c.user_id)
+        .where(auction_participants.c.auction_id.in_([row.id for row in rows]))
+    )
+    for auction_id, username in found:
+        names.setdefault(auction_id, []).append(username)
+    for row in rows:
+        yield serialize_row(row, names.get(row.id, []))
+
+def fetch_listing(query):
+    """Run a listing_query() and serialize it: two SQL statements whatever the page size."""
+    rows = query.all()
+    names = participant_names([row.id for row in rows]) if rows else {}
+    return [serialize_row(row, names.get(row.id, [])) for row in rows]
@@ -1,6 +1,43 @@
-from models import db, Auction, Bid, User
+from models import db, Auction, Bid, User, auction_participants
+from services.alert_percolator import notify_price_crossings
+from services.event_broker import publish_price
+from services.response_cache import invalidate_auction
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 from datetime import datetime
 
+def add_participant(auction, user_id):
+    """
+    Insert-if-absent into auction_participants. Returns True if the user was newly added.
+
+    One statement against the composite primary key, instead of loading
+    every participant through Auction.participants to test membership.
+    A new participant also bumps auction.participant_count (and so its version).
+    """
+    auction_id = auction.id
+    values = {'auction_id': auction_id, 'user_id': user_id}
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(auction_participants).values(**values).on_conflict_do_nothing()
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = insert(auction_participants).values(**values).prefix_with('IGNORE')
+    elif dialect == 'postgresql':
+        stmt = postgresql_insert(auction_participants).values(**values).on_conflict_do_nothing()
+    else:
+        exists = db.session.execute(
+            select(auction_participants.c.user_id)
+            .where(auction_participants.c.auction_id == auction_id)
+            .where(auction_participants.c.user_id == user_id)
+        ).first()
+        if exists:
+            return False
+        stmt = insert(auction_participants).values(**values)
+    added = db.session.execute(stmt).rowcount == 1
+    if added:
+        auction.participant_count = (auction.participant_count or 0) + 1
+    return added
+
 def place_bid_logic(auction_id, bidder_id, amount, upper_limit=None):
     auction = Auction.query.get(auction_id)
     if not auction:
@@ -36,15 +73,20 @@ def place_bid_logic(auction_id, bidder_id, amount, upper_limit=None):
         time=datetime.utcnow()
     )
     
+    previous_price = auction.current_price
     auction.current_price = amount
     auction.winner_id = bidder_id
+    auction.bid_count = (auction.bid_count or 0) + 1
+    auction.last_bid_at = new_bid.time
     
     # Add to participants if not already
     bidder = User.query.get(bidder_id)
-    if bidder not in auction.participants:
-        auction.participants.append(bidder)
+    add_participant(auction, bidder_id)
         
     db.session.add(new_bid)
+    notify_price_crossings(auction.item, auction, previous_price)
+    publish_price(auction)
+    invalidate_auction(auction.id, auction.item_id, bids=True)
     db.session.commit()
     
     return {'message': 'Bid placed successfully', 'current_price': amount, 'winner': bidder.username}, 200
@@ -0,0 +1,208 @@
+from models import db, Bid
+from services.tx_hooks import on_commit, on_rollback
+from sqlalchemy import func
+from collections import OrderedDict
+import heapq
+import itertools
+import threading
+
+# Above any bid id, so bidders whose first bid is not stored yet lose ties to those whose is
+PENDING_TIE_BREAK = 10 ** 12
+
+class _AuctionBids:
+    """Best bid and standing proxy limit per bidder, with lazily-cleaned max-heaps over both."""
+
+    __slots__ = ('version', 'best', 'limits', 'bid_heap', 'limit_heap')
+
+    def __init__(self, version):
+        self.version = version
+        self.best = {}        # bidder_id -> highest bid amount
+        self.limits = {}      # bidder_id -> (standing limit, tie_break)
+        self.bid_heap = []    # (-amount, bidder_id)
+        self.limit_heap = []  # (-limit, tie_break, bidder_id)
+
+    def set_bidder(self, bidder_id, best, limit, tie_break):
+        if best is None:
+            self.best.pop(bidder_id, None)
+            self.limits.pop(bidder_id, None)
+            return
+        self.best[bidder_id] = best
+        self.limits[bidder_id] = (limit, tie_break)
+        heapq.heappush(self.bid_heap, (-best, bidder_id))
+        heapq.heappush(self.limit_heap, (-limit, tie_break, bidder_id))
+
+    def add_bid(self, bidder_id, amount, upper_limit, tie_break):
+        best = max(self.best.get(bidder_id, amount), amount)
+        limit, first = self.limits.get(bidder_id, (0, tie_break))
+        self.set_bidder(bidder_id, best, max(limit, upper_limit or 0, amount), first)
+
+    def top_bid(self):
+        # Entries superseded by a newer value for the same bidder are dropped on the way
+        while self.bid_heap:
+            amount, bidder_id = self.bid_heap[0]
+            if self.best.get(bidder_id) == -amount:
+                return bidder_id, -amount
+            heapq.heappop(self.bid_heap)
+        return None
+
+    def top_limits(self, k):
+        found = []
+        while self.limit_heap and len(found) < k:
+            entry = heapq.heappop(self.limit_heap)
+            limit, tie_break, bidder_id = entry
+            if self.limits.get(bidder_id) == (-limit, tie_break) and entry not in found:
+                found.append(entry)
+        for entry in found:
+            heapq.heappush(self.limit_heap, entry)
+        return {bidder_id: (-limit, tie_break) for limit, tie_break, bidder_id in found}
+
+class BidIndex:
+    """
+    Per-process top-K index of the bids on recently used auctions.
+
+    Entries are tagged with the auction version they were built at and are
+    rebuilt from the bids table whenever the caller's auction row carries a
+    different version, so writes from other processes are picked up. Writers
+    in this process update entries in place inside their transaction; the
+    entry moves to the new version on commit and is dropped on rollback.
+    """
+
+    def __init__(self, max_auctions=1024):
+        self.max_auctions = max_auctions
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._arrivals = itertools.count(1)
+        self.hits = 0
+        self.rebuilds = 0
+
+    def _entry(self, auction_id, version):
+        with self._lock:
+            entry = self._entries.get(auction_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(auction_id)
+                self.hits += 1
+                return entry
+        entry = self._build(auction_id, version)
+        with self._lock:
+            self._entries[auction_id] = entry
+            self._entries.move_to_end(auction_id)
+            while len(self._entries) > self.max_auctions:
+                self._entries.popitem(last=False)
+            self.rebuilds += 1
+        return entry
+
+    def _build(self, auction_id, version, exclude_bid_id=None):
+        entry = _AuctionBids(version)
+        for bidder_id, best, limit, first_id in _bidder_rows(auction_id, exclude_bid_id=exclude_bid_id):
+            entry.set_bidder(bidder_id, best, max(limit or 0, best), first_id)
+        return entry
+
+    def pending_tie_break(self):
+        """Tie-break for a bidder whose first bid has no id yet: after every stored bid, in arrival order."""
+        return PENDING_TIE_BREAK + next(self._arrivals)
+
+    # Readers pass the auction version they loaded, before changing the auction.
+    # _entry builds outside the lock, so a cold auction never holds up the others
+
+    def top_bid(self, auction_id, version):
+        """(bidder_id, amount) of the highest bid, or None."""
+        entry = self._entry(auction_id, version)
+        with self._lock:
+            return entry.top_bid()
+
+    def top_limits(self, auction_id, version, k=3):
+        """{bidder_id: (limit, tie_break)} for the k highest standing limits."""
+        entry = self._entry(auction_id, version)
+        with self._lock:
+            return entry.top_limits(k)
+
+    def limit_of(self, auction_id, version, bidder_id):
+        entry = self._entry(auction_id, version)
+        with self._lock:
+            return entry.limits.get(bidder_id)
+
+    # Writers pass the version they read and the auction after its update is flushed
+
+    def record_bids(self, auction, base_version, rows):
+        """Apply this transaction's flushed bid rows to the auction's entry."""
+        with self._lock:
+            entry = self._entries.get(auction.id)
+            if entry is None:
+                return
+            if entry.version != base_version:
+                # Built from other state than this transaction wrote on top of
+                del self._entries[auction.id]
+                return
+            for row in rows:
+                # A new bidder's first bid has no id here; it ranks after every stored bid on ties
+                entry.add_bid(row['bidder_id'], row['amount'], row.get('upper_limit'), self.pending_tie_break())
+            self._stage(auction, entry)
+
+    def record_delete(self, auction, base_version, bid):
+        """
+        Reload the bidder of a bid about to be deleted, without it; returns the
+        new top bid. Call before changing anything in the session, then write
+        the delete and the auction's new price in one flush: the entry is
+        staged for the version that single update gives the auction.
+        """
+        rows = _bidder_rows(auction.id, bid.bidder_id, exclude_bid_id=bid.id)
+        with self._lock:
+            entry = self._entries.get(auction.id)
+            stale = entry is None or entry.version != base_version
+        if stale:
+            # Built outside the lock, already without the deleted bid
+            entry = self._build(auction.id, base_version, exclude_bid_id=bid.id)
+        with self._lock:
+            if stale:
+                self._entries[auction.id] = entry
+            elif rows:
+                _, best, limit, first_id = rows[0]
+                entry.set_bidder(bid.bidder_id, best, max(limit or 0, best), first_id)
+            else:
+                entry.set_bidder(bid.bidder_id, None, None, None)
+            self._stage(auction, entry, base_version + 1)
+            return entry.top_bid()
+
+    def _stage(self, auction, entry, new_version=None):
+        """Hide the entry from readers until the transaction settles (then at `new_version`, default the flushed one)."""
+        entry.version = None
+        auction_id = auction.id
+        if new_version is None:
+            new_version = auction.version
+
+        def publish():
+            with self._lock:
+                if self._entries.get(auction_id) is entry:
+                    entry.version = new_version
+
+        def discard():
+            with self._lock:
+                if self._entries.get(auction_id) is entry:
+                    del self._entries[auction_id]
+
+        on_commit(publish)
+        on_rollback(discard)
+
+    def clear(self):
+        """Forget every entry, e.g. when the process switches to another database."""
+        with self._lock:
+            self._entries.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {'auctions': len(self._entries), 'hits': self.hits, 'rebuilds': self.rebuilds}
+
+def _bidder_rows(auction_id, bidder_id=None, exclude_bid_id=None):
+    query = db.session.query(
+        Bid.bidder_id,
+        func.max(Bid.amount),
+        func.max(Bid.upper_limit),
+        func.min(Bid.id)
+    ).filter(Bid.auction_id == auction_id)
+    if bidder_id is not None:
+        query = query.filter(Bid.bidder_id == bidder_id)
+    if exclude_bid_id is not None:
+        query = query.filter(Bid.id != exclude_bid_id)
+    return query.group_by(Bid.bidder_id).all()
+
+bid_index = BidIndex()
@@ -0,0 +1,173 @@
+from models import db
+from services.concurrency import retry_on_conflict
+from services.group_commit import BidWriteBuffer
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+class BidSequencer:
+    """
+    Single writer per auction for hot bidding.
+
+    Every bid for one auction goes through that auction's queue and is applied
+    by one worker thread, in arrival order. After the first bid of a batch the
+    worker keeps collecting for up to batch_latency seconds or max_batch bids,
+    applies each bid against the in-session auction state, then writes the
+    batch's Bid and Notification rows with one executemany INSERT per table
+    and commits once.
+
+    Callers wait on a Future for their own (body, status) result. A caller
+    that gives up can cancel() the Future: a bid still in the queue is then
+    dropped, while one already in a batch runs to completion. With
+    durability 'commit' the Future resolves after the batch is committed;
+    with 'accept' it resolves as soon as the bid is validated in memory,
+    which is lossy: if the batch then fails and the bid cannot be replayed,
+    the client already has its 201. Such bids are logged, counted as `lost`
+    and handed to the caller's on_lost() so the bidder can be told.
+    Workers exit after idle_timeout seconds without work and are recreated
+    on the next bid.
+    """
+
+    def __init__(self, app, max_batch=64, batch_latency=0.005, durability='commit', idle_timeout=30.0):
+        if durability not in ('commit', 'accept'):
+            raise ValueError(f"Unknown bid durability mode: {durability}")
+        self.app = app
+        self.max_batch = max_batch
+        self.batch_latency = batch_latency
+        self.durability = durability
+        self.idle_timeout = idle_timeout
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.applied = 0
+        self.rows_flushed = 0
+        self.replays = 0
+        self.lost = 0
+
+    def submit(self, key, fn, *args, on_lost=None):
+        """
+        Queue fn(*args, buffer=...) on the worker for `key`; returns a Future of its result.
+        on_lost() runs (and commits) if an acknowledged bid fails to be written.
+        """
+        future = Future()
+        with self._lock:
+            q = self._queues.get(key)
+            if q is None:
+                q = queue.Queue()
+                self._queues[key] = q
+                worker = threading.Thread(target=self._run, args=(key, q), daemon=True,
+                                          name=f'bid-sequencer-{key}')
+                worker.start()
+            # Enqueue under the lock so an idle worker cannot retire past it
+            q.put((future, fn, args, on_lost))
+        return future
+
+    def _run(self, key, q):
+        with self.app.app_context():
+            try:
+                while True:
+                    try:
+                        batch = [q.get(timeout=self.idle_timeout)]
+                    except queue.Empty:
+                        with self._lock:
+                            if q.empty():
+                                del self._queues[key]
+                                return
+                        continue
+                    self._fill(q, batch)
+                    self._apply(batch)
+            finally:
+                db.session.remove()
+
+    def _fill(self, q, batch):
+        """Collect more bids until the batch is full or its latency budget is spent."""
+        deadline = time.monotonic() + self.batch_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(q.get(timeout=remaining))
+                else:
+                    batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+
+    def _apply(self, batch):
+        buffer = BidWriteBuffer()
+        results = []
+        try:
+            # Callers that timed out cancelled their bids; the rest can no longer be cancelled
+            batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+            if not batch:
+                return
+            # Rejected bids return before touching the session or buffer,
+            # so only accepted ones are part of the group commit
+            for future, fn, args, _ in batch:
+                result = fn(*args, buffer=buffer)
+                results.append(result)
+                if self.durability == 'accept':
+                    future.set_result(result)
+            rows = buffer.flush()
+            db.session.commit()
+        except Exception:
+            # Another process moved the auction (StaleDataError) or one bid
+            # failed; fall back to one transaction per bid so only it fails
+            db.session.rollback()
+            self._replay(batch)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.applied += len(batch)
+            self.rows_flushed += rows
+        for (future, _, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _replay(self, batch):
+        with self._stats_lock:
+            self.replays += 1
+        for future, fn, args, on_lost in batch:
+            acknowledged = future.done()
+            try:
+                result = retry_on_conflict(fn, *args)
+            except Exception as e:
+                db.session.rollback()
+                if acknowledged:
+                    self._lost(args, on_lost, e)
+                else:
+                    future.set_exception(e)
+                continue
+            if not acknowledged:
+                future.set_result(result)
+            elif result[1] >= 300:
+                # Valid when acknowledged, rejected on replay (e.g. outbid meanwhile)
+                self._lost(args, on_lost, result[0].get('message'))
+
+    def _lost(self, args, on_lost, reason):
+        self.app.logger.error(f'Accepted bid {args} was lost after acknowledgement: {reason}')
+        with self._stats_lock:
+            self.lost += 1
+        if on_lost is None:
+            return
+        try:
+            on_lost()
+        except Exception as e:
+            db.session.rollback()
+            self.app.logger.error(f'Could not tell the bidder about lost bid {args}: {e}')
+
+    def to_dict(self):
+        with self._stats_lock:
+            return {
+                'active_workers': len(self._queues),
+                'durability': self.durability,
+                'batches': self.batches,
+                'bids_applied': self.applied,
+                'rows_flushed': self.rows_flushed,
+                'avg_batch_size': round(self.applied / self.batches, 2) if self.batches else 0.0,
+                'commits_per_bid': round(self.batches / self.applied, 4) if self.applied else 0.0,
+                'replays': self.replays,
+                'lost': self.lost
+            }
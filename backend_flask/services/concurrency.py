@@ -0,0 +1,76 @@
+from models import db
+from sqlalchemy.orm.exc import StaleDataError
+from flask import current_app
+import random
+import threading
+import time
+
+class ConflictStats:
+    """Thread-safe counters for optimistic-concurrency writes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.attempts = 0
+            self.commits = 0
+            self.rejected = 0
+            self.conflicts = 0
+            self.retries = 0
+            self.exhausted = 0
+
+    def record(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def to_dict(self):
+        with self._lock:
+            calls = self.commits + self.rejected + self.exhausted
+            return {
+                'attempts': self.attempts,
+                'commits': self.commits,
+                'rejected': self.rejected,
+                'conflicts': self.conflicts,
+                'retries': self.retries,
+                'exhausted': self.exhausted,
+                'conflict_rate': round(self.conflicts / self.attempts, 4) if self.attempts else 0.0,
+                'retries_per_call': round(self.retries / calls, 4) if calls else 0.0
+            }
+
+bid_stats = ConflictStats()
+
+def retry_on_conflict(fn, *args, stats=bid_stats, **kwargs):
+    """
+    Run fn inside a transaction, retrying when a versioned row changed underneath it.
+
+    fn must do all its reads and writes through db.session and return without
+    committing; it may return a (body, status) tuple for early exits, in which
+    case the transaction is rolled back. Raises StaleDataError once
+    BID_MAX_RETRIES is exhausted.
+    """
+    max_retries = current_app.config.get('BID_MAX_RETRIES', 5)
+    attempt = 0
+    while True:
+        stats.record(attempts=1)
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, tuple) and result[1] >= 400:
+                db.session.rollback()
+                stats.record(rejected=1)
+                return result
+            db.session.commit()
+            stats.record(commits=1)
+            return result
+        except StaleDataError:
+            db.session.rollback()
+            stats.record(conflicts=1)
+            if attempt >= max_retries:
+                stats.record(exhausted=1)
+                raise
+            attempt += 1
+            stats.record(retries=1)
+            # Small jittered backoff so the retries do not collide again
+            time.sleep(random.uniform(0, 0.002 * attempt))
@@ -0,0 +1,121 @@
+from services.tx_hooks import on_commit
+from collections import deque
+import itertools
+import threading
+
+class Subscription:
+    """
+    One connected client's queue of (id, event, data) across its channels.
+
+    The queue is bounded: a client that stops reading loses its oldest
+    events and is flagged `overflowed`, so it can be told to refetch.
+    """
+
+    def __init__(self, channels, max_events=100):
+        self.channels = tuple(channels)
+        self.overflowed = False
+        self._events = deque(maxlen=max_events)
+        self._wake = threading.Event()
+
+    def _put(self, event):
+        if len(self._events) == self._events.maxlen:
+            self.overflowed = True
+        self._events.append(event)
+        self._wake.set()
+
+    def wait(self, timeout):
+        """Events published since the last call, waiting up to timeout seconds for one."""
+        if not self._events:
+            self._wake.wait(timeout)
+        self._wake.clear()
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+class EventBroker:
+    """
+    In-process publish/subscribe for live updates (served as SSE by routes/events.py).
+
+    Channels are plain strings: 'user:<id>' for a user's own events and
+    'auction:<id>' for an auction's public ones. Publishing only appends to
+    the queues of current subscribers; an idle subscriber is one blocked
+    thread and an empty deque. Events reach clients connected to this
+    process only, so with several workers a client sees the writes its own
+    worker makes and keeps polling as a fallback for the rest.
+    """
+
+    def __init__(self, max_events=100):
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._channels = {}  # channel -> {Subscription}
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+
+    def init_app(self, app):
+        self.max_events = app.config['EVENTS_QUEUE_SIZE']
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, self.max_events)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, event, data):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+            self.published += 1
+            self.delivered += len(subscribers)
+            event_id = next(self._ids)
+        for subscription in subscribers:
+            subscription._put((event_id, event, data))
+
+    def publish_on_commit(self, channel, event, data):
+        """publish() once the current transaction commits; nothing is sent if it rolls back."""
+        on_commit(lambda: self.publish(channel, event, data))
+
+    def clear(self):
+        """Drop every subscription and zero the counters."""
+        with self._lock:
+            self._channels.clear()
+            self.published = self.delivered = 0
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'subscribers': len({s for subscribers in self._channels.values() for s in subscribers}),
+                'published': self.published,
+                'delivered': self.delivered
+            }
+
+event_broker = EventBroker()
+
+def publish_notifications(rows):
+    """Push Notification rows (dicts) being written in this transaction to their users."""
+    for row in rows:
+        event_broker.publish_on_commit(f"user:{row['user_id']}", 'notification', {
+            'title': row['title'],
+            'description': row['description'],
+            'type': row.get('type', 'info')
+        })
+
+def publish_price(auction):
+    """Push an auction's new price to everyone watching it."""
+    event_broker.publish_on_commit(f'auction:{auction.id}', 'price', {
+        'auction_id': auction.id,
+        'item_id': auction.item_id,
+        'current_price': auction.current_price,
+        'bid_count': auction.bid_count
+    })
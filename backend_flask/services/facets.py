@@ -0,0 +1,93 @@
+from models import Auction, Item
+from services.response_cache import response_cache, AUCTION_SET, AUCTION_BIDS
+from sqlalchemy import case, func
+
+# Upper edges of the price histogram buckets; the last bucket is open-ended
+PRICE_EDGES = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+def _bucket_labels():
+    labels = []
+    lower = 0
+    for edge in PRICE_EDGES:
+        labels.append({'min': lower, 'max': edge})
+        lower = edge
+    labels.append({'min': lower, 'max': None})
+    return labels
+
+def price_bucket():
+    """Index into PRICE_EDGES of the bucket holding Auction.current_price."""
+    return case(
+        *[(Auction.current_price < edge, i) for i, edge in enumerate(PRICE_EDGES)],
+        else_=len(PRICE_EDGES)
+    )
+
+def compute_counts(query, category=None):
+    """
+    Category and subcategory counts for a listing query.
+
+    `query` carries every filter except category and subcategory: category
+    counts ignore the category filter (the other choices stay visible), and
+    subcategory counts are within the chosen category.
+    """
+    rows = query.with_entities(Item.category, Item.subcategory, func.count(Auction.id))\
+        .order_by(None)\
+        .group_by(Item.category, Item.subcategory)\
+        .all()
+
+    categories = {}
+    subcategories = {}
+    for row_category, row_subcategory, count in rows:
+        categories[row_category] = categories.get(row_category, 0) + count
+        if category and row_category != category:
+            continue
+        if row_subcategory:
+            subcategories[row_subcategory] = subcategories.get(row_subcategory, 0) + count
+    return {
+        'categories': [{'name': name, 'count': count}
+                       for name, count in sorted(categories.items(), key=lambda c: (-c[1], c[0] or ''))],
+        'subcategories': [{'name': name, 'count': count}
+                          for name, count in sorted(subcategories.items(), key=lambda c: (-c[1], c[0]))]
+    }
+
+def compute_histogram(query, category=None, subcategory=None):
+    """Auctions per price bucket for a listing query, within the chosen category and subcategory."""
+    if category:
+        query = query.filter(Item.category == category)
+    if subcategory:
+        query = query.filter(Item.subcategory == subcategory)
+    bucket = price_bucket().label('bucket')
+    rows = query.with_entities(bucket, func.count(Auction.id))\
+        .order_by(None)\
+        .group_by(bucket)\
+        .all()
+
+    histogram = [0] * (len(PRICE_EDGES) + 1)
+    for row_bucket, count in rows:
+        histogram[row_bucket] += count
+    buckets = _bucket_labels()
+    for entry, count in zip(buckets, histogram):
+        entry['count'] = count
+    return buckets
+
+def compute_facets(query, category=None, subcategory=None):
+    """Category counts, subcategory counts and a price histogram for a listing query (see compute_counts)."""
+    facets = compute_counts(query, category)
+    facets['price_histogram'] = compute_histogram(query, category, subcategory)
+    return facets
+
+def cached_facets(query, signature, category=None, subcategory=None):
+    """
+    compute_facets through the cache, in two parts. The counts depend only
+    on which auctions exist, so they stay cached until one is created,
+    closed or deleted, unless a price filter makes them depend on prices
+    too. The price histogram is dropped on every bid.
+    """
+    key = '&'.join(f'{k}={v}' for k, v in sorted(signature.items()) if v)
+    count_tags = [AUCTION_SET]
+    if signature.get('min_price') or signature.get('max_price'):
+        count_tags.append(AUCTION_BIDS)
+    facets = dict(response_cache.memoize('facet-counts?' + key, count_tags,
+                                         lambda: compute_counts(query, category)))
+    facets['price_histogram'] = response_cache.memoize('facet-prices?' + key, [AUCTION_SET, AUCTION_BIDS],
+                                                       lambda: compute_histogram(query, category, subcategory))
+    return facets
@@ -0,0 +1,70 @@
+from models import db, Bid, Notification
+from services.bid_index import bid_index
+from services.event_broker import publish_notifications
+from sqlalchemy import insert
+
+class BidWriteBuffer:
+    """
+    Bid and Notification rows waiting to be written.
+
+    Rows are plain dicts so flush() can send each table as a single
+    executemany INSERT. Standing proxy limits come from the bid index, merged
+    with the limits of bids buffered here, so later bids in the same batch
+    see the earlier ones without a flush.
+    """
+
+    def __init__(self):
+        self.bids = []
+        self.notifications = []
+        self._auctions = {}  # auction_id -> (auction, version read by this transaction)
+        self._pending = {}   # auction_id -> {bidder_id: (limit, tie_break)} from buffered bids
+        self.announced = {}  # (user_id, auction_id) -> in_range, price alerts queued in this transaction
+
+    def track(self, auction):
+        """Remember the version an auction had before this transaction changed it."""
+        self._auctions.setdefault(auction.id, (auction, auction.version))
+
+    def limits_for(self, auction_id):
+        """The highest standing limits on a tracked auction, enough to resolve proxy bids."""
+        auction, version = self._auctions[auction_id]
+        limits = bid_index.top_limits(auction_id, version)
+        limits.update(self._pending.get(auction_id, {}))
+        return limits
+
+    def add_bid(self, **row):
+        self.bids.append(row)
+        auction_id, bidder_id = row['auction_id'], row['bidder_id']
+        auction, version = self._auctions[auction_id]
+        pending = self._pending.setdefault(auction_id, {})
+        previous = pending.get(bidder_id) or bid_index.limit_of(auction_id, version, bidder_id)
+        previous_limit, tie_break = previous or (0, bid_index.pending_tie_break())
+        pending[bidder_id] = (max(previous_limit, row.get('upper_limit') or 0, row['amount']), tie_break)
+        # Counters ride along with the auction's own UPDATE; set after the index lookup,
+        # which may autoflush, so the auction is written once
+        auction.bid_count = (auction.bid_count or 0) + 1
+        auction.last_bid_at = max(auction.last_bid_at or row['time'], row['time'])
+
+    def add_notification(self, **row):
+        self.notifications.append(row)
+
+    def __len__(self):
+        return len(self.bids) + len(self.notifications)
+
+    def flush(self):
+        """Write the buffered rows inside the current transaction. Does not commit."""
+        written = len(self)
+        # Auction updates first, so their new versions are known to the index
+        db.session.flush()
+        if self.bids:
+            db.session.execute(insert(Bid), self.bids)
+            for auction_id, (auction, version) in self._auctions.items():
+                rows = [row for row in self.bids if row['auction_id'] == auction_id]
+                if rows:
+                    bid_index.record_bids(auction, version, rows)
+        if self.notifications:
+            db.session.execute(insert(Notification), self.notifications)
+            publish_notifications(self.notifications)
+        self.bids = []
+        self.notifications = []
+        self._pending = {}
+        return written
@@ -0,0 +1,108 @@
+from bisect import bisect_left, bisect_right
+
+_LOW = float('-inf')
+_HIGH = float('inf')
+
+class _Node:
+    __slots__ = ('center', 'by_low', 'by_high', 'left', 'right')
+
+    def __init__(self, intervals):
+        # Centered interval tree: intervals containing the center live here,
+        # the rest go left (entirely below) or right (entirely above)
+        points = sorted(p for low, high, _ in intervals for p in (low, high) if p not in (_LOW, _HIGH))
+        self.center = points[len(points) // 2] if points else 0.0
+        here, left, right = [], [], []
+        for interval in intervals:
+            low, high, _ = interval
+            if high < self.center:
+                left.append(interval)
+            elif low > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_low = sorted(here, key=lambda i: i[0])
+        self.by_high = sorted(here, key=lambda i: -i[1])
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+class IntervalIndex:
+    """
+    Closed intervals [low, high] (None = unbounded) with stabbing queries.
+
+    Built as a static centered interval tree, so a query costs
+    O(log n + matches), plus the endpoints in sorted order for crossing
+    queries. Changes mark the structures stale and they are rebuilt on the
+    next query, which suits data that is read far more than written.
+    """
+
+    def __init__(self):
+        self._intervals = {}  # key -> (low, high)
+        self._root = None
+        self._lows = self._low_keys = self._highs = self._high_keys = ()
+        self._stale = False
+
+    def add(self, key, low, high):
+        self._intervals[key] = (_LOW if low is None else low, _HIGH if high is None else high)
+        self._stale = True
+
+    def remove(self, key):
+        if self._intervals.pop(key, None) is not None:
+            self._stale = True
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def _rebuild(self):
+        intervals = [(low, high, key) for key, (low, high) in self._intervals.items()]
+        self._root = _Node(intervals) if intervals else None
+        by_low = sorted((low, key) for low, _, key in intervals if low != _LOW)
+        by_high = sorted((high, key) for _, high, key in intervals if high != _HIGH)
+        self._lows, self._low_keys = [p for p, _ in by_low], [k for _, k in by_low]
+        self._highs, self._high_keys = [p for p, _ in by_high], [k for _, k in by_high]
+        self._stale = False
+
+    def stab(self, point):
+        """Keys of every interval containing point."""
+        if self._stale:
+            self._rebuild()
+        found = []
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                for low, _, key in node.by_low:
+                    if low > point:
+                        break
+                    found.append(key)
+                node = node.left
+            elif point > node.center:
+                for _, high, key in node.by_high:
+                    if high < point:
+                        break
+                    found.append(key)
+                node = node.right
+            else:
+                found.extend(key for _, _, key in node.by_low)
+                break
+        return found
+
+    def crossing(self, old, new):
+        """
+        (entered, left): keys of the intervals containing new but not old,
+        and old but not new.
+
+        Only intervals with an endpoint between the two points can differ,
+        so this reads two slices of the sorted endpoints: O(log n) plus the
+        endpoints passed over.
+        """
+        if self._stale:
+            self._rebuild()
+        if old == new:
+            return [], []
+        lo, hi = min(old, new), max(old, new)
+        # Starts in (lo, hi] and still open at hi: contains hi only
+        only_hi = [key for key in self._low_keys[bisect_right(self._lows, lo):bisect_right(self._lows, hi)]
+                   if self._intervals[key][1] >= hi]
+        # Ends in [lo, hi) and already open at lo: contains lo only
+        only_lo = [key for key in self._high_keys[bisect_left(self._highs, lo):bisect_left(self._highs, hi)]
+                   if self._intervals[key][0] <= lo]
+        return (only_hi, only_lo) if new > old else (only_lo, only_hi)
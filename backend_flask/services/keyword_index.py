@@ -0,0 +1,110 @@
+from models import db, Item, Alert, item_terms, alert_keywords
+from services.text_tokens import distinct_tokens, keyword_tokens, MIN_PREFIX
+from sqlalchemy import event, select, insert, delete, and_
+
+# Width of the term columns; longer words are indexed by their leading part
+MAX_TERM = 100
+
+def _item_rows(item_id, name, description):
+    terms = {token[:MAX_TERM] for token in distinct_tokens(name, description)}
+    return [{'item_id': item_id, 'term': term} for term in sorted(terms)]
+
+def _alert_rows(alert_id, keywords):
+    tokens = {token[:MAX_TERM] for token in keyword_tokens(keywords)}
+    return [{'alert_id': alert_id, 'token': token} for token in sorted(tokens)]
+
+def _write(connection, table, key, key_value, rows, replace):
+    if replace:
+        connection.execute(delete(table).where(key == key_value))
+    if rows:
+        connection.execute(insert(table), rows)
+
+# Kept in step by mapper events, so every path that writes items or alerts
+# through the ORM maintains the index in the same transaction
+
+@event.listens_for(Item, 'after_insert')
+def _index_new_item(mapper, connection, item):
+    _write(connection, item_terms, item_terms.c.item_id, item.id,
+           _item_rows(item.id, item.name, item.description), replace=False)
+
+@event.listens_for(Item, 'after_update')
+def _reindex_item(mapper, connection, item):
+    state = db.inspect(item)
+    if state.attrs.name.history.has_changes() or state.attrs.description.history.has_changes():
+        _write(connection, item_terms, item_terms.c.item_id, item.id,
+               _item_rows(item.id, item.name, item.description), replace=True)
+
+@event.listens_for(Item, 'before_delete')
+def _unindex_item(mapper, connection, item):
+    connection.execute(delete(item_terms).where(item_terms.c.item_id == item.id))
+
+@event.listens_for(Alert, 'after_insert')
+def _index_new_alert(mapper, connection, alert):
+    _write(connection, alert_keywords, alert_keywords.c.alert_id, alert.id,
+           _alert_rows(alert.id, alert.keywords), replace=False)
+
+@event.listens_for(Alert, 'after_update')
+def _reindex_alert(mapper, connection, alert):
+    if db.inspect(alert).attrs.keywords.history.has_changes():
+        _write(connection, alert_keywords, alert_keywords.c.alert_id, alert.id,
+               _alert_rows(alert.id, alert.keywords), replace=True)
+
+@event.listens_for(Alert, 'before_delete')
+def _unindex_alert(mapper, connection, alert):
+    connection.execute(delete(alert_keywords).where(alert_keywords.c.alert_id == alert.id))
+
+def has_term(token):
+    """
+    Predicate on Item: a word of its name or description is this token or,
+    for tokens of MIN_PREFIX characters or more, starts with it. Prefixes are
+    a range scan on the (item_id, term) primary key: term >= p AND term < p_next.
+    """
+    token = token[:MAX_TERM]
+    if len(token) < MIN_PREFIX:
+        matches = item_terms.c.term == token
+    else:
+        matches = and_(item_terms.c.term >= token, item_terms.c.term < _successor(token))
+    return select(item_terms.c.item_id)\
+        .where(item_terms.c.item_id == Item.id, matches)\
+        .exists()
+
+def _successor(prefix):
+    """The smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def alert_tokens(alert_ids):
+    """{alert_id: [token, ...]} from the alert_keywords table."""
+    tokens = {}
+    if alert_ids:
+        rows = db.session.execute(
+            select(alert_keywords.c.alert_id, alert_keywords.c.token)
+            .where(alert_keywords.c.alert_id.in_(alert_ids))
+        )
+        for alert_id, token in rows:
+            tokens.setdefault(alert_id, []).append(token)
+    return tokens
+
+def _backfill(unindexed, table, to_rows, batch_size):
+    pending = db.session.execute(unindexed).all()
+    for start in range(0, len(pending), batch_size):
+        rows = [row for record in pending[start:start + batch_size] for row in to_rows(*record)]
+        if rows:
+            db.session.execute(insert(table), rows)
+    return len(pending)
+
+def backfill_keyword_index(batch_size=500):
+    """
+    Index the items and alerts that have no rows yet (used by migrate_db).
+    Returns how many (items, alerts) were indexed.
+    """
+    items = _backfill(
+        select(Item.id, Item.name, Item.description)
+        .where(~select(item_terms.c.item_id).where(item_terms.c.item_id == Item.id).exists()),
+        item_terms, _item_rows, batch_size)
+    alerts = _backfill(
+        select(Alert.id, Alert.keywords)
+        .where(Alert.keywords.isnot(None), Alert.keywords != '',
+               ~select(alert_keywords.c.alert_id).where(alert_keywords.c.alert_id == Alert.id).exists()),
+        alert_keywords, _alert_rows, batch_size)
+    db.session.commit()
+    return items, alerts
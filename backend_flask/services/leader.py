@@ -0,0 +1,79 @@
+from models import db, Lease
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import os
+import socket
+import time
+import uuid
+
+class LeaderLease:
+    """
+    Database-backed leader election for background jobs.
+
+    One row per job name in `leases` records the holder and an expiry. The
+    holder renews well before expiry; any other process may take the row
+    over once it has expired, so a dead leader is replaced within about one
+    ttl. Both steps are single conditional statements, so two processes can
+    never both believe they hold the lease at the same time.
+    """
+
+    def __init__(self, name, ttl=15.0):
+        self.name = name
+        self.ttl = ttl
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._valid_until = 0.0
+        self._last_attempt = 0.0
+
+    @property
+    def renew_interval(self):
+        return self.ttl / 3
+
+    def is_leader(self):
+        return time.monotonic() < self._valid_until
+
+    def ensure(self):
+        """Renew or try to take the lease if it is time to; returns whether we lead."""
+        if time.monotonic() - self._last_attempt >= self.renew_interval or not self.is_leader():
+            self.acquire()
+        return self.is_leader()
+
+    def acquire(self):
+        started = time.monotonic()
+        self._last_attempt = started
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            result = db.session.execute(
+                update(Lease)
+                .where(Lease.name == self.name)
+                .where(or_(Lease.holder == self.holder, Lease.expires_at < now))
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            acquired = result.rowcount == 1
+            if not acquired and db.session.get(Lease, self.name) is None:
+                db.session.execute(insert(Lease).values(name=self.name, holder=self.holder, expires_at=expires_at))
+                acquired = True
+            db.session.commit()
+        except IntegrityError:
+            # Another process created the row first
+            db.session.rollback()
+            acquired = False
+        # Count validity from before the statement ran, with a margin for clock skew
+        self._valid_until = started + self.ttl * 0.8 if acquired else 0.0
+        return acquired
+
+    def release(self):
+        if not self.is_leader():
+            return
+        db.session.execute(
+            update(Lease)
+            .where(Lease.name == self.name)
+            .where(Lease.holder == self.holder)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.session.commit()
+        self._valid_until = 0.0
+
+    def to_dict(self):
+        return {'name': self.name, 'holder': self.holder, 'is_leader': self.is_leader()}
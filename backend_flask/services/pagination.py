@@ -0,0 +1,81 @@
+from sqlalchemy import and_, or_
+import base64
+import json
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for a keyset position (a list of JSON-able values)."""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, size, types=None):
+    """
+    The values of a cursor from encode_cursor. With `types`, one converter
+    per value (e.g. datetime.fromisoformat, int); any value they reject
+    makes the whole cursor invalid.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(cursor)
+    if types:
+        try:
+            values = [convert(value) for convert, value in zip(types, values)]
+        except (ValueError, TypeError):
+            raise InvalidCursor(cursor)
+    return values
+
+def keyset_after(columns, values, descending):
+    """Filter for rows strictly after `values` in (columns...) order.
+
+    Written as nested OR/AND instead of a row-value comparison so both
+    SQLite and MySQL can use the composite index behind it.
+    """
+    column, value = columns[0], values[0]
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return or_(beyond, and_(column == value, keyset_after(columns[1:], values[1:], descending)))
+
+def parse_limit(raw, default, maximum):
+    try:
+        limit = int(raw) if raw is not None else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+def estimate_count(query, table, filtered, cap=1000):
+    """
+    A cheap row count for a listing: (count, is_exact).
+
+    Unfiltered listings read the table statistics the engine already keeps
+    (MySQL's information_schema row estimate, SQLite's max rowid). Filtered
+    ones count at most `cap` matching rows, so the cost never grows with the
+    catalogue; hitting the cap reports (cap, False).
+    """
+    from models import db
+    from sqlalchemy import func, text
+
+    if not filtered:
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('mysql', 'mariadb'):
+            rows = db.session.execute(text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+            ), {'name': table.name}).scalar()
+            if rows is not None:
+                return int(rows), False
+        elif dialect == 'sqlite':
+            rows = db.session.execute(text(f"SELECT max(rowid) FROM {table.name}")).scalar()
+            return int(rows or 0), False
+
+    capped = query.with_entities(table.c.id).order_by(None).limit(cap + 1).subquery()
+    count = db.session.query(func.count()).select_from(capped).scalar()
+    if count > cap:
+        return cap, False
+    return count, True
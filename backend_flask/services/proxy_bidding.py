@@ -0,0 +1,55 @@
+from datetime import datetime
+
+def resolve_proxy_bids(leader_id, price, limits, increment):
+    """
+    Work out the outcome of a proxy-bid war in one step.
+
+    `limits` maps bidder_id -> (limit, tie_break) where lower tie_break (the
+    bidder's first bid) wins equal limits, so on a tie the earlier proxy
+    keeps the lead over a bidder who arrives later. Returns the auto bids
+    to record as (bidder_id, amount, upper_limit) tuples, in order: at most
+    the runner-up's final bid at their limit and the winner's final bid at
+    the runner-up's limit plus one increment, capped at the winner's limit.
+    """
+    if leader_id is None:
+        return []
+
+    leader_limit, leader_tie_break = limits.get(leader_id, (price, float('inf')))
+    ranked = [(max(leader_limit, price), leader_tie_break, leader_id)]
+    for bidder_id, (limit, tie_break) in limits.items():
+        if bidder_id != leader_id and limit >= price:
+            ranked.append((limit, tie_break, bidder_id))
+    if len(ranked) < 2:
+        return []
+
+    # Highest limit first, then the earliest bidder
+    ranked.sort(key=lambda r: (-r[0], r[1]))
+    winner_limit, _, winner_id = ranked[0]
+    runner_limit, _, runner_id = ranked[1]
+
+    steps = []
+    if runner_limit > price and runner_id != winner_id:
+        # Runner-up is pushed all the way to their limit
+        steps.append((runner_id, runner_limit, runner_limit))
+        price = runner_limit
+        leader_id = runner_id
+
+    if winner_id != leader_id:
+        final_price = min(price + increment, winner_limit)
+        steps.append((winner_id, final_price, winner_limit))
+    return steps
+
+def apply_proxy_bids(auction, steps, buffer, now=None):
+    """Buffer the auto bids from resolve_proxy_bids and move the auction price. Does not flush."""
+    now = now or datetime.utcnow()
+    for bidder_id, amount, upper_limit in steps:
+        buffer.add_bid(
+            auction_id=auction.id,
+            bidder_id=bidder_id,
+            amount=amount,
+            upper_limit=upper_limit,
+            is_auto_bid=True,
+            time=now
+        )
+        auction.current_price = amount
+        auction.winner_id = bidder_id
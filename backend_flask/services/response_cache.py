@@ -0,0 +1,332 @@
+from flask import request, current_app, g
+from services.tx_hooks import on_commit
+from services.streaming import stream_format
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import json
+import threading
+import time
+
+class MemoryBackend:
+    """
+    Per-process LRU store with a TTL on every entry.
+
+    Tag generations live outside the LRU: evicting one would reset it to
+    zero and could bring invalidated entries back to life.
+    """
+
+    # Only sees writes made in this process
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            found = self._entries.get(key)
+            if found is None:
+                return None
+            expires_at, value = found
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+class RedisBackend:
+    """
+    Shared store for several workers. Needs the optional `redis` package.
+
+    Redis expires and evicts entries itself (configure maxmemory-policy for
+    LRU); tag generations are plain INCR counters without a TTL.
+    """
+
+    shared = True
+
+    def __init__(self, url, prefix='buyme:cache:'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._redis.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def generations(self, tags):
+        values = self._redis.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(v) if v is not None else 0 for v in values]
+
+    def bump(self, tags):
+        pipe = self._redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(self.prefix + 'tag:' + tag)
+        pipe.execute()
+
+    def clear(self):
+        for key in self._redis.scan_iter(self.prefix + '*'):
+            self._redis.delete(key)
+
+    def to_dict(self):
+        info = self._redis.info('stats')
+        return {
+            'backend': 'redis',
+            'evictions': info.get('evicted_keys'),
+            'expirations': info.get('expired_keys')
+        }
+
+class ResponseCache:
+    """
+    Cache of whole JSON responses for public GET routes, invalidated by tag.
+
+    Every entry records the generation of each tag it depends on when the
+    response was built (e.g. 'auction-set', 'auction:7'). Writers bump the
+    generations of the tags they touched once their transaction commits, so
+    an entry is served only while nothing it was built from has changed;
+    one built while a write was committing is never served. The TTL bounds
+    staleness for writes made by other processes when the backend is not
+    shared.
+    """
+
+    def __init__(self, backend=None, ttl=30):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['RESPONSE_CACHE']
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+        if app.config.get('RESPONSE_CACHE_URL'):
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_URL'])
+        else:
+            self.backend = MemoryBackend(app.config['RESPONSE_CACHE_SIZE'])
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key, tags, etag=None):
+        """
+        The cached (body, etag) for key if none of its tags changed since, else None.
+        With `etag`, the entry must also have been built at that version.
+        """
+        entry = self.backend.get(key)
+        if entry is not None:
+            generations, body, stored_etag = entry
+            if generations == self.backend.generations(tags) and etag in (None, stored_etag):
+                self._count('hits')
+                return body, stored_etag
+        self._count('misses')
+        return None
+
+    def set(self, key, generations, body, etag):
+        self.backend.set(key, [generations, body, etag], self.ttl)
+
+    def memoize(self, key, tags, build):
+        """build() through the cache: for derived data (not whole responses) that depends on tags."""
+        if not self.enabled:
+            return build()
+        found = self.get(key, tags)
+        if found is not None:
+            return found[0]
+        generations = self.backend.generations(tags)
+        value = build()
+        self.set(key, generations, value, None)
+        return value
+
+    def invalidate(self, *tags):
+        """Drop every entry depending on any of the tags, once the current transaction commits."""
+        def bump():
+            self.backend.bump(tags)
+            with self._lock:
+                self.invalidations += 1
+        on_commit(bump)
+
+    def clear(self):
+        """Drop every entry and zero the counters."""
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def to_dict(self):
+        with self._lock:
+            stats = {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / (self.hits + self.misses), 4) if self.hits + self.misses else 0.0
+            }
+        stats.update(self.backend.to_dict())
+        return stats
+
+response_cache = ResponseCache()
+
+# Which auctions exist and are open: moves on create, close and delete only
+AUCTION_SET = 'auction-set'
+# Any auction's price, winner or counters: moves on every bid placed or removed
+AUCTION_BIDS = 'auction-bids'
+
+def invalidate_auction(auction_id, item_id, bids=False, membership=False):
+    """
+    Tags to drop when an auction's row (price, winner, status, participants)
+    changes: always the auction's and item's own; plus AUCTION_BIDS and
+    'items' when `bids` moved what listings show (price, winner, counters);
+    plus AUCTION_SET when `membership` changed (created, closed or deleted).
+    Data that depends only on which auctions exist (e.g. category counts)
+    is tagged AUCTION_SET alone and survives bids.
+    """
+    tags = [f'auction:{auction_id}', f'item:{item_id}']
+    if bids or membership:
+        tags += [AUCTION_BIDS, 'items']
+    if membership:
+        tags.append(AUCTION_SET)
+    response_cache.invalidate(*tags)
+
+def cache_key():
+    """Route path plus query parameters in a canonical order, ignoring empty ones."""
+    params = sorted((k, v) for k, values in request.args.lists() for v in values if v != '')
+    return request.path + '?' + '&'.join(f'{k}={v}' for k, v in params)
+
+def conditional(version):
+    """
+    Strong ETag from a cheap version lookup, checked before the view runs.
+
+    `version(**view_kwargs)` returns a string identifying the current state
+    of everything the response shows (e.g. from Auction.version), or None
+    when there is nothing to tag. A matching If-None-Match is answered 304
+    without calling the view. The tag is read before the body is built, so
+    a response is never labelled newer than its content.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            tag = version(**kwargs)
+            g.etag = tag
+            if tag is not None and request.if_none_match.contains(tag):
+                response = current_app.response_class(status=304)
+                response.set_etag(tag)
+                return response
+            response = current_app.make_response(view(**kwargs))
+            if tag is not None and response.status_code == 200:
+                response.set_etag(tag)
+            return response
+        return wrapper
+    return decorator
+
+def _cacheable(response):
+    # Streamed exports are never buffered for the cache
+    return response.status_code == 200 and response.mimetype == 'application/json' and not response.is_streamed
+
+def _content_etag(body):
+    return hashlib.sha1(body.encode()).hexdigest()[:20]
+
+def _tag_etag(key, generations):
+    """
+    ETag for a response built from tagged data: the cache key plus the tag
+    generations, known before the view runs. A per-process backend misses
+    other processes' writes, so its tags also roll over once per TTL, the
+    same bound as its cached bodies.
+    """
+    epoch = '' if response_cache.backend.shared else int(time.time() // response_cache.ttl)
+    raw = f'{key}|{",".join(map(str, generations))}|{epoch}'
+    return 'g-' + hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+def _with_etag(response, etag):
+    """Label a cached or fresh body; without a version-based tag, use a hash of the body."""
+    if g.get('etag') is None:
+        response.set_etag(etag)
+        response.make_conditional(request)
+    return response
+
+def cached(*tags):
+    """
+    Cache a public JSON GET route. Tags may use the view's arguments,
+    e.g. @cached(AUCTION_SET, 'auction:{id}'). Only 200 responses are stored.
+
+    Under @conditional an entry is only served while its ETag is still the
+    current one, which also catches writes made by other processes. Without
+    it (listings) the ETag comes from the tag generations, so a matching
+    If-None-Match is answered 304 before the view or the cache is touched.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            version_tag = g.get('etag')
+            if stream_format():
+                # Streamed exports bypass the cache (and ?format= / Accept is not in the key)
+                return view(**kwargs)
+            if not response_cache.enabled:
+                response = current_app.make_response(view(**kwargs))
+                if _cacheable(response):
+                    _with_etag(response, _content_etag(response.get_data(as_text=True)))
+                return response
+            entry_tags = [tag.format(**kwargs) for tag in tags]
+            key = cache_key()
+            # Read the generations before building, so a write committing meanwhile wins
+            generations = response_cache.backend.generations(entry_tags)
+            if version_tag is None:
+                version_tag = _tag_etag(key, generations)
+                if request.if_none_match.contains(version_tag):
+                    response = current_app.response_class(status=304)
+                    response.set_etag(version_tag)
+                    return response
+            found = response_cache.get(key, entry_tags, version_tag)
+            if found is not None:
+                body, etag = found
+                response = current_app.response_class(body, status=200, mimetype='application/json')
+                return _with_etag(response, etag)
+
+            response = current_app.make_response(view(**kwargs))
+            if _cacheable(response):
+                body = response.get_data(as_text=True)
+                response_cache.set(key, generations, body, version_tag)
+                _with_etag(response, version_tag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,119 @@
+from models import db, Item
+from sqlalchemy import event, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+import re
+
+# Columns covered by the full-text index, in index order
+SEARCH_COLUMNS = ('name', 'description', 'category', 'subcategory')
+
+_SQLITE_INDEX = [
+    # External-content FTS5 table: the text lives in items, only the index is stored here
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        {', '.join(SEARCH_COLUMNS)}, content='items', content_rowid='id', tokenize='porter unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+        INSERT INTO items_fts(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    "INSERT INTO items_fts(items_fts) VALUES ('rebuild')"
+]
+
+# InnoDB maintains FULLTEXT indexes itself on every insert, update and delete
+_MYSQL_INDEX = f"ALTER TABLE items ADD FULLTEXT INDEX ft_items_search ({', '.join(SEARCH_COLUMNS)})"
+
+_backends = {}
+
+def create_search_index(connection):
+    """Create (or rebuild) the full-text index over items for this connection's dialect."""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        for statement in _SQLITE_INDEX:
+            connection.execute(text(statement))
+    elif dialect in ('mysql', 'mariadb'):
+        exists = connection.execute(text(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'items' AND INDEX_NAME = 'ft_items_search'"
+        )).scalar()
+        if not exists:
+            connection.execute(text(_MYSQL_INDEX))
+    _backends.pop(connection.engine.url, None)
+
+@event.listens_for(Item.__table__, 'after_create')
+def _create_with_items_table(target, connection, **kw):
+    create_search_index(connection)
+
+@event.listens_for(Item.__table__, 'before_drop')
+def _drop_with_items_table(target, connection, **kw):
+    # SQLite drops the triggers with the table, but not the FTS table itself
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("DROP TABLE IF EXISTS items_fts"))
+    _backends.pop(connection.engine.url, None)
+
+def ensure_search_index():
+    """Add the full-text index to a database created before it existed (used by migrate_db)."""
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+
+def search_backend():
+    """'fts5', 'fulltext' or None when no full-text index exists; checked once per engine."""
+    engine = db.engine
+    if engine.url not in _backends:
+        backend = None
+        with engine.connect() as connection:
+            dialect = connection.dialect.name
+            if dialect == 'sqlite':
+                found = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'"
+                )).first()
+                backend = 'fts5' if found else None
+            elif dialect in ('mysql', 'mariadb'):
+                found = connection.execute(text(
+                    "SELECT 1 FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'items' AND INDEX_NAME = 'ft_items_search' LIMIT 1"
+                )).first()
+                backend = 'fulltext' if found else None
+        _backends[engine.url] = backend
+    return _backends[engine.url]
+
+def search_terms(keyword):
+    """Split a keyword string into plain word terms; query syntax characters are dropped."""
+    return re.findall(r'\w+', keyword.lower())
+
+def apply_keyword_search(query, keyword):
+    """
+    Restrict a query that has Item joined to items matching every term of `keyword`.
+
+    Terms are prefix-matched. Returns (query, relevance) where relevance is a
+    column to order by (higher is better), or None when the database has no
+    full-text index and the old substring match is used instead.
+    """
+    terms = search_terms(keyword)
+    backend = search_backend() if terms else None
+
+    if backend == 'fts5':
+        # bm25() is lower-is-better; negate it so every backend sorts relevance descending
+        hits = text("SELECT rowid AS item_id, -bm25(items_fts) AS relevance FROM items_fts WHERE items_fts MATCH :match")\
+            .bindparams(match=' AND '.join(f'"{term}"*' for term in terms))\
+            .columns(item_id=db.Integer, relevance=db.Float)\
+            .subquery('fts_hits')
+        return query.join(hits, hits.c.item_id == Item.id), hits.c.relevance
+
+    if backend == 'fulltext':
+        relevance = mysql_match(*[getattr(Item, c) for c in SEARCH_COLUMNS],
+                                against=' '.join(f'+{term}*' for term in terms)).in_boolean_mode()
+        return query.filter(relevance > 0), relevance
+
+    query = query.filter(
+        (Item.name.ilike(f'%{keyword}%')) |
+        (Item.description.ilike(f'%{keyword}%'))
+    )
+    return query, None
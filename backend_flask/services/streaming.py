@@ -0,0 +1,59 @@
+from flask import request, current_app, stream_with_context
+
+NDJSON = 'application/x-ndjson'
+
+# Rows fetched per round trip, and bytes gathered before each write to the client
+BATCH_SIZE = 500
+CHUNK_BYTES = 32 * 1024
+
+def stream_format():
+    """
+    The streaming mode a list request asked for, or None for a normal response.
+
+    ?format=ndjson (or Accept: application/x-ndjson) gives one JSON object per
+    line; ?format=stream gives the usual JSON document, sent as it is built.
+    """
+    fmt = request.args.get('format')
+    if fmt == 'ndjson':
+        return 'ndjson'
+    if fmt == 'stream':
+        return 'array'
+    if any(mimetype == NDJSON for mimetype, _ in request.accept_mimetypes):
+        return 'ndjson'
+    return None
+
+def stream_response(rows, fmt, envelope='data'):
+    """
+    Stream an iterable of JSON-able rows without holding them all.
+
+    In 'array' mode the output matches the non-streaming response:
+    {"data": [...]} with the envelope, a bare list without.
+    """
+    dumps = current_app.json.dumps
+
+    def pieces():
+        if fmt == 'ndjson':
+            for row in rows:
+                yield dumps(row) + '\n'
+            return
+        yield '{"%s": [' % envelope if envelope else '['
+        separator = ''
+        for row in rows:
+            yield separator + dumps(row)
+            separator = ','
+        yield ']}' if envelope else ']'
+
+    def chunks():
+        # One write per ~32KB instead of one per row
+        buffer, size = [], 0
+        for piece in pieces():
+            buffer.append(piece)
+            size += len(piece)
+            if size >= CHUNK_BYTES:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+
+    mimetype = NDJSON if fmt == 'ndjson' else 'application/json'
+    return current_app.response_class(stream_with_context(chunks()), mimetype=mimetype)
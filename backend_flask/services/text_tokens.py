@@ -0,0 +1,46 @@
+import re
+
+# Alert keywords shorter than this must match a whole word
+MIN_PREFIX = 3
+
+_WORD = re.compile(r'\w+')
+
+def stem(word):
+    """Fold plain English plurals: 'bikes' -> 'bike', 'boxes' -> 'box', 'batteries' -> 'battery'."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'ches', 'shes', 'xes', 'zes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+def tokenize(text):
+    """Lowercased, stemmed word tokens of a text, in order (duplicates kept)."""
+    if not text:
+        return []
+    return [stem(word) for word in _WORD.findall(text.lower())]
+
+def distinct_tokens(*texts):
+    """The set of tokens across the texts."""
+    return {token for text in texts for token in tokenize(text)}
+
+def index_terms(*texts):
+    """
+    Every term a text can be matched on: its tokens plus their prefixes of
+    at least MIN_PREFIX characters, so the keyword 'bik' finds 'biking'.
+    For matching in memory; item_terms stores whole tokens only.
+    """
+    terms = set()
+    for text in texts:
+        for token in tokenize(text):
+            terms.add(token)
+            for end in range(MIN_PREFIX, len(token)):
+                terms.add(token[:end])
+    return terms
+
+def keyword_tokens(keywords):
+    """The tokens an alert's keywords (a list, or the stored comma-separated text) require."""
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+    return {token for keyword in keywords or () for token in tokenize(keyword)}
@@ -0,0 +1,26 @@
+from models import db
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+def on_commit(fn):
+    """Run fn() after the current db.session transaction commits. Dropped on rollback.
+
+    Callbacks run outside the transaction and must not use the session.
+    """
+    db.session.info.setdefault('on_commit', []).append(fn)
+
+def on_rollback(fn):
+    """Run fn() if the current db.session transaction rolls back. Dropped on commit."""
+    db.session.info.setdefault('on_rollback', []).append(fn)
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(session):
+    session.info.pop('on_rollback', None)
+    for fn in session.info.pop('on_commit', []):
+        fn()
+
+@event.listens_for(Session, 'after_rollback')
+def _run_on_rollback(session):
+    session.info.pop('on_commit', None)
+    for fn in session.info.pop('on_rollback', []):
+        fn()
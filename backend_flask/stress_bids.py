@@ -0,0 +1,281 @@
+"""
+Concurrency stress harness for the bid path, with auction invariant checks.
+
+Many threads hammer POST /api/bid/<item_id> (manual and proxy bids) and
+DELETE /api/bid/<bid_id> (as a customer rep) on a handful of auctions,
+then every auction is checked:
+
+  - current_price equals the highest remaining bid (initial_price if none)
+  - winner_id is a bidder holding that highest bid
+  - no bid undercuts the increment rule against the bids before it
+  - auction_participants contains every bidder
+  - bid_count, participant_count and last_bid_at match the bids and participants
+
+On a violation the schedule of operations on that auction is replayed one
+at a time on a fresh database and shrunk to a minimal sequence that still
+breaks the invariant. If it only breaks under concurrency, the interleaved
+operations are printed instead. Exits non-zero when an invariant fails.
+
+    python stress_bids.py --threads 16 --ops 3000
+    BID_SEQUENCER=true python stress_bids.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+EPSILON = 1e-9
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Stress the bid path and check auction invariants.')
+    parser.add_argument('--auctions', type=int, default=3)
+    parser.add_argument('--users', type=int, default=12)
+    parser.add_argument('--threads', type=int, default=12)
+    parser.add_argument('--ops', type=int, default=1500, help='operations across all threads')
+    parser.add_argument('--delete-ratio', type=float, default=0.1)
+    parser.add_argument('--proxy-ratio', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=527)
+    return parser.parse_args()
+
+class World:
+    """A freshly seeded database plus the handles the operations need."""
+
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.reset()
+
+    def reset(self):
+        from models import db, User, Item, Auction
+        from routes.auth import generate_token
+        from app import reset_caches
+        from werkzeug.security import generate_password_hash
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            password = generate_password_hash('stress')
+            seller = User(username='stress_seller', email='seller@stress.local', password=password)
+            rep = User(username='stress_rep', email='rep@stress.local', password=password, is_rep=True)
+            users = [User(username=f'stress_user_{i}', email=f'user{i}@stress.local', password=password)
+                     for i in range(self.args.users)]
+            db.session.add_all([seller, rep] + users)
+            db.session.flush()
+            self.items = []
+            for i in range(self.args.auctions):
+                item = Item(name=f'Stress item {i}', category='Stress', seller_id=seller.id)
+                db.session.add(item)
+                db.session.flush()
+                db.session.add(Auction(item_id=item.id, end_time=datetime.utcnow() + timedelta(days=1),
+                                       initial_price=10.0, current_price=10.0, increment=1.0, min_price=0))
+                self.items.append(item.id)
+            db.session.commit()
+            self.user_ids = [u.id for u in users]
+            self.tokens = [generate_token(u.id) for u in users]
+            self.rep_token = generate_token(rep.id)
+        # Row ids and auction versions restart from zero, so cached entries would look fresh
+        reset_caches()
+
+    def apply(self, http, op):
+        """Run one recorded operation; returns the HTTP status."""
+        kind = op['kind']
+        item_id = self.items[op['auction']]
+        if kind == 'bid':
+            body = {'amount': op['amount']}
+            if op.get('upper_limit'):
+                body['upper_limit'] = op['upper_limit']
+            response = http.post(f'/api/bid/{item_id}', json=body,
+                                 headers={'Authorization': f"Bearer {self.tokens[op['user']]}"})
+            op['price'] = (response.get_json(silent=True) or {}).get('current_price')
+            return response.status_code
+
+        bid_id = self.find_bid(op['auction'], op['user'], op['amount'])
+        if bid_id is None:
+            return 404
+        response = http.delete(f'/api/bid/{bid_id}', headers={'Authorization': f'Bearer {self.rep_token}'})
+        return response.status_code
+
+    def find_bid(self, auction_index, user_index, amount):
+        from models import db, Bid, Auction
+        with self.app.app_context():
+            return db.session.query(Bid.id).join(Auction, Bid.auction_id == Auction.id)\
+                .filter(Auction.item_id == self.items[auction_index])\
+                .filter(Bid.bidder_id == self.user_ids[user_index])\
+                .filter(Bid.amount == amount)\
+                .order_by(Bid.id).limit(1).scalar()
+
+    def pick_bid(self, rng, auction_index):
+        """A random existing bid on the auction, as (user_index, amount)."""
+        from models import db, Bid, Auction
+        with self.app.app_context():
+            rows = db.session.query(Bid.bidder_id, Bid.amount).join(Auction, Bid.auction_id == Auction.id)\
+                .filter(Auction.item_id == self.items[auction_index]).all()
+        if not rows:
+            return None
+        bidder_id, amount = rng.choice(rows)
+        return self.user_ids.index(bidder_id), amount
+
+    def violations(self, auction_index):
+        """Invariant failures on one auction, as human-readable strings."""
+        from models import db, Bid, Auction, auction_participants
+        problems = []
+        with self.app.app_context():
+            auction = Auction.query.filter_by(item_id=self.items[auction_index]).first()
+            bids = Bid.query.filter_by(auction_id=auction.id).order_by(Bid.id).all()
+            participants = {row[0] for row in db.session.query(auction_participants.c.user_id)
+                            .filter(auction_participants.c.auction_id == auction.id)}
+
+            if bids:
+                top = max(b.amount for b in bids)
+                if abs(auction.current_price - top) > EPSILON:
+                    problems.append(f'current_price {auction.current_price} != top bid {top}')
+                top_bidders = {b.bidder_id for b in bids if abs(b.amount - top) <= EPSILON}
+                if auction.winner_id not in top_bidders:
+                    problems.append(f'winner_id {auction.winner_id} not among top bidders {sorted(top_bidders)}')
+            else:
+                if abs(auction.current_price - auction.initial_price) > EPSILON:
+                    problems.append(f'no bids but current_price {auction.current_price} != initial {auction.initial_price}')
+                if auction.winner_id is not None:
+                    problems.append(f'no bids but winner_id {auction.winner_id}')
+
+            increment = auction.increment or 1.0
+            best_so_far = None
+            for bid in bids:
+                if best_so_far is not None:
+                    floor = best_so_far if bid.is_auto_bid else best_so_far + increment
+                    if bid.amount < floor - EPSILON:
+                        problems.append(f'bid {bid.id} ({bid.amount}, auto={bid.is_auto_bid}) under the increment rule (floor {floor})')
+                best_so_far = bid.amount if best_so_far is None else max(best_so_far, bid.amount)
+
+            missing = {b.bidder_id for b in bids} - participants
+            if missing:
+                problems.append(f'bidders {sorted(missing)} missing from auction_participants')
+
+            if auction.bid_count != len(bids):
+                problems.append(f'bid_count {auction.bid_count} != {len(bids)} bids')
+            if auction.participant_count != len(participants):
+                problems.append(f'participant_count {auction.participant_count} != {len(participants)} participants')
+            last_bid_at = max((b.time for b in bids), default=None)
+            if auction.last_bid_at != last_bid_at:
+                problems.append(f'last_bid_at {auction.last_bid_at} != latest bid time {last_bid_at}')
+        return problems
+
+def generate(world, rng, args, log, log_lock, counter):
+    """One client thread: pick random operations until the shared budget is spent."""
+    http = world.app.test_client()
+    while True:
+        with log_lock:
+            if counter[0] >= args.ops:
+                return
+            counter[0] += 1
+        auction = rng.randrange(len(world.items))
+        if rng.random() < args.delete_ratio:
+            picked = world.pick_bid(rng, auction)
+            if picked is None:
+                continue
+            op = {'kind': 'delete', 'auction': auction, 'user': picked[0], 'amount': picked[1]}
+        else:
+            with log_lock:
+                known = max([o['price'] for o in log if o['auction'] == auction and o.get('price')] or [10.0])
+            amount = known + rng.randint(1, 3)
+            op = {'kind': 'bid', 'auction': auction, 'user': rng.randrange(len(world.tokens)), 'amount': amount}
+            if rng.random() < args.proxy_ratio:
+                op['upper_limit'] = amount + rng.randint(1, 15)
+        op['started'] = time.perf_counter()
+        op['status'] = world.apply(http, op)
+        op['finished'] = time.perf_counter()
+        with log_lock:
+            log.append(op)
+
+def replay(world, ops, auction_index):
+    world.reset()
+    http = world.app.test_client()
+    for op in ops:
+        world.apply(http, dict(op))
+    return world.violations(auction_index)
+
+def shrink(world, ops, auction_index):
+    """Delta-debugging: drop chunks of the schedule while the violation still reproduces."""
+    chunk = max(1, len(ops) // 2)
+    while chunk >= 1:
+        i = 0
+        shrunk = False
+        while i < len(ops):
+            candidate = ops[:i] + ops[i + chunk:]
+            if candidate and replay(world, candidate, auction_index):
+                ops = candidate
+                shrunk = True
+            else:
+                i += chunk
+        if not shrunk:
+            chunk //= 2
+    return ops
+
+def describe(op):
+    if op['kind'] == 'bid':
+        limit = f", upper_limit={op['upper_limit']}" if op.get('upper_limit') else ''
+        return f"user {op['user']} bids {op['amount']}{limit} on auction {op['auction']}"
+    return f"rep deletes user {op['user']}'s bid of {op['amount']} on auction {op['auction']}"
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='buyme-stress-')
+    # Config reads the environment at import time
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'stress.db')
+    os.environ.setdefault('AUCTION_CLOSER', 'false')
+
+    from app import create_app
+    app = create_app()
+    world = World(app, args)
+
+    log = []
+    log_lock = threading.Lock()
+    counter = [0]
+    threads = [threading.Thread(target=generate, args=(world, random.Random(args.seed + i), args, log, log_lock, counter))
+               for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for op in log:
+        statuses[op['status']] = statuses.get(op['status'], 0) + 1
+    print(f"{len(log)} operations in {elapsed:.2f}s across {args.threads} threads; statuses {dict(sorted(statuses.items()))}")
+
+    failed = False
+    for auction_index in range(len(world.items)):
+        problems = world.violations(auction_index)
+        if not problems:
+            continue
+        failed = True
+        print(f"\nAuction {auction_index}: invariant violated")
+        for problem in problems:
+            print(f"  - {problem}")
+
+        # Successful operations on this auction, in completion order
+        schedule = sorted([op for op in log if op['auction'] == auction_index and op['status'] < 400],
+                          key=lambda op: op['finished'])
+        if replay(world, schedule, auction_index):
+            minimal = shrink(world, schedule, auction_index)
+            print(f"  Reproduces sequentially; minimal schedule ({len(minimal)} of {len(schedule)} ops):")
+            for step, op in enumerate(minimal, 1):
+                print(f"    {step}. {describe(op)}")
+        else:
+            print("  Does not reproduce sequentially; concurrent operations on this auction:")
+            for op in sorted([op for op in log if op['auction'] == auction_index], key=lambda op: op['started']):
+                print(f"    [{op['started'] - started:8.4f}s - {op['finished'] - started:8.4f}s] "
+                      f"{describe(op)} -> {op['status']}")
+
+    if failed:
+        sys.exit(1)
+    print("All auction invariants hold.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Leader election test for the auction closer.
+
+Builds the app against a throwaway SQLite database and runs two
+AuctionClosers, each with its own LeaderLease on the same database, as two
+workers would. Checks that exactly one of them settles the ended auctions
+(each once), and that the other takes over when the leader stops.
+
+    python test_leader_lease.py
+    python -m pytest test_leader_lease.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+TTL = 1.5
+AUCTIONS = 20
+
+def build_app():
+    workdir = tempfile.mkdtemp(prefix='buyme-lease-')
+    # Config reads the environment at import time
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'lease.db')
+    os.environ['RESPONSE_CACHE'] = 'false'
+    from app import create_app
+    from models import db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+def add_ended_auctions(app, count):
+    """`count` auctions that ended a minute ago, each with one bid; returns their ids."""
+    from models import db, User, Item, Auction, Bid
+
+    with app.app_context():
+        seller = User.query.filter_by(username='lease_seller').first()
+        buyer = User.query.filter_by(username='lease_buyer').first()
+        if seller is None:
+            seller = User(username='lease_seller', email='seller@lease.local', password='x')
+            buyer = User(username='lease_buyer', email='buyer@lease.local', password='x')
+            db.session.add_all([seller, buyer])
+            db.session.flush()
+        now = datetime.utcnow()
+        ids = []
+        for i in range(count):
+            item = Item(name=f'Lease item {i}', category='Lease', seller_id=seller.id)
+            db.session.add(item)
+            db.session.flush()
+            auction = Auction(item_id=item.id, start_time=now - timedelta(days=1), end_time=now - timedelta(minutes=1),
+                              initial_price=10.0, current_price=12.0, increment=1.0, min_price=0,
+                              winner_id=buyer.id, bid_count=1)
+            db.session.add(auction)
+            db.session.flush()
+            db.session.add(Bid(auction_id=auction.id, bidder_id=buyer.id, amount=12.0, time=now))
+            ids.append(auction.id)
+        db.session.commit()
+        return ids
+
+def wait_until_closed(app, ids, timeout):
+    from models import db, Auction
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            open_count = db.session.query(Auction).filter(Auction.id.in_(ids), Auction.is_active == True).count()
+            db.session.remove()
+        if open_count == 0:
+            return True
+        time.sleep(0.1)
+    return False
+
+def won_notifications(app):
+    from models import db, Notification
+
+    with app.app_context():
+        count = db.session.query(Notification).filter_by(title='Auction Won').count()
+        db.session.remove()
+        return count
+
+def check_single_leader():
+    """A list of problems; empty when exactly one closer settles at a time."""
+    from services.auction_closer import AuctionCloser
+    from services.leader import LeaderLease
+
+    app = build_app()
+    first_ids = add_ended_auctions(app, AUCTIONS)
+    closers = [AuctionCloser(app, lease=LeaderLease('auction-closer', ttl=TTL), scan_interval=1) for _ in range(2)]
+    for closer in closers:
+        closer.start()
+
+    problems = []
+    if not wait_until_closed(app, first_ids, timeout=TTL * 4):
+        problems.append('ended auctions were not all settled')
+    leaders = [closer for closer in closers if closer.lease.is_leader()]
+    settled = sorted(closer.closed for closer in closers)
+    if len(leaders) != 1:
+        problems.append(f'{len(leaders)} closers hold the lease, expected 1')
+    if settled != [0, AUCTIONS]:
+        problems.append(f'closers settled {settled} auctions, expected one to settle all {AUCTIONS}')
+    if won_notifications(app) != AUCTIONS:
+        problems.append(f'{won_notifications(app)} winner notifications for {AUCTIONS} auctions')
+
+    # The leader stops (releasing the lease); the other one must take over
+    leader = max(closers, key=lambda closer: closer.closed)
+    follower = next(closer for closer in closers if closer is not leader)
+    leader.stop()
+    leader._thread.join(TTL * 2)
+    second_ids = add_ended_auctions(app, AUCTIONS)
+    if not wait_until_closed(app, second_ids, timeout=TTL * 4):
+        problems.append('the follower did not take over after the leader stopped')
+    elif follower.closed != AUCTIONS or leader.closed != AUCTIONS:
+        problems.append(f'after failover the closers settled {leader.closed} and {follower.closed}')
+    follower.stop()
+    return problems
+
+def test_exactly_one_closer_settles():
+    problems = check_single_leader()
+    assert not problems, '\n'.join(problems)
+
+if __name__ == '__main__':
+    problems = check_single_leader()
+    if problems:
+        print('Leader election failed:')
+        for problem in problems:
+            print(f'  - {problem}')
+        sys.exit(1)
+    print('Exactly one auction closer settled each ended auction, and the other took over on shutdown.')
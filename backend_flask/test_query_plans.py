@@ -0,0 +1,165 @@
+"""
+Query plan regression test for the hot read and write paths.
+
+Builds the app against a throwaway SQLite database, seeds a little data,
+calls each hot route while recording the SQL it runs, then asks SQLite
+for the EXPLAIN QUERY PLAN of every statement. Fails if any of them has
+to read a whole table (a bare "SCAN <table>" with no index behind it).
+
+    python test_query_plans.py
+    python -m pytest test_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Routes and jobs whose queries must be index-backed: (label, method, path)
+HOT_ROUTES = [
+    ('auction listing', 'GET', '/api/auction/?limit=20'),
+    ('auction listing, next page', 'GET', '/api/auction/?limit=2&cursor={cursor}'),
+    ('auction listing by price', 'GET', '/api/auction/?limit=20&sort=price_asc&min_price=5&max_price=500'),
+    ('auction listing by end date', 'GET', '/api/auction/?limit=20&sort=date_desc'),
+    ('auction listing by category', 'GET', '/api/auction/?limit=20&category=Home'),
+    ('auction listing by most bids', 'GET', '/api/auction/?limit=20&sort=bids_desc'),
+    ('auction keyword search', 'GET', '/api/auction/?limit=20&keyword=lamp&sort=relevance'),
+    ('auction detail', 'GET', '/api/auction/{auction_id}'),
+    ('similar auctions', 'GET', '/api/auction/similar/{auction_id}'),
+    ('bid history', 'GET', '/api/bid/{item_id}?limit=20'),
+    ('place bid', 'POST', '/api/bid/{item_id}'),
+    ('my bids', 'GET', '/api/user/my-bids'),
+    ('my auctions', 'GET', '/api/user/my-auctions'),
+    ('notifications', 'GET', '/api/notification/'),
+    ('unread notifications', 'GET', '/api/notification/unread-count'),
+    ('my alerts', 'GET', '/api/alert/'),
+    ('alert matches', 'GET', '/api/alert/matches'),
+    ('my questions', 'GET', '/api/question/my'),
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+def build_app():
+    workdir = tempfile.mkdtemp(prefix='buyme-plans-')
+    # Config reads the environment at import time
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'plans.db')
+    os.environ['AUCTION_CLOSER'] = 'false'
+    os.environ['RESPONSE_CACHE'] = 'false'
+    from app import create_app
+    return create_app()
+
+def seed(app):
+    from models import db, User, Item, Auction, Bid, Notification, Alert, Question
+    from routes.auth import generate_token
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        db.create_all()
+        password = generate_password_hash('plans')
+        seller = User(username='plan_seller', email='seller@plans.local', password=password)
+        buyer = User(username='plan_buyer', email='buyer@plans.local', password=password)
+        db.session.add_all([seller, buyer])
+        db.session.flush()
+        now = datetime.utcnow()
+        for i in range(6):
+            item = Item(name=f'Desk lamp {i}', description='a lamp', category='Home' if i % 2 else 'Sports',
+                        seller_id=seller.id)
+            db.session.add(item)
+            db.session.flush()
+            auction = Auction(item_id=item.id, start_time=now - timedelta(days=i), end_time=now + timedelta(days=1 + i),
+                              initial_price=10.0, current_price=10.0 + i, increment=1.0, min_price=0)
+            db.session.add(auction)
+            db.session.flush()
+            db.session.add(Bid(auction_id=auction.id, bidder_id=buyer.id, amount=10.0 + i, time=now))
+        db.session.add(Notification(user_id=buyer.id, title='Hello', description='plans'))
+        db.session.add(Alert(user_id=buyer.id, keywords='lamp', category='Home'))
+        db.session.add(Question(text='Where?', asker_id=buyer.id))
+        db.session.commit()
+        return {
+            'auction_id': auction.id,
+            'item_id': item.id,
+            'seller': {'Authorization': f'Bearer {generate_token(seller.id)}'},
+            'buyer': {'Authorization': f'Bearer {generate_token(buyer.id)}'},
+        }
+
+def record_statements(app, fn):
+    """Run fn() and return the (statement, parameters) it sent to the database."""
+    from models import db
+    from sqlalchemy import event
+
+    seen = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            seen.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+    return seen
+
+def full_scans(app, statement, parameters):
+    """Tables the plan reads end to end, ignoring subquery results and virtual tables."""
+    from models import db
+
+    words = statement.lstrip().split(None, 1)
+    if not words or words[0].upper() not in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+        return []
+    tables = set(db.metadata.tables)
+    with app.app_context():
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            details = [row[3] for row in cursor.fetchall()]
+        finally:
+            raw.close()
+    return [detail for detail in details
+            if FULL_SCAN.match(detail) and FULL_SCAN.match(detail).group(1) in tables]
+
+def check_plans():
+    app = build_app()
+    ctx = seed(app)
+    http = app.test_client()
+    from services.auction_closer import AuctionCloser
+
+    ctx['cursor'] = http.get('/api/auction/?limit=2').get_json()['next_cursor']
+    problems = []
+
+    def check(label, run):
+        for statement, parameters in record_statements(app, run):
+            for scan in full_scans(app, statement, parameters):
+                problems.append(f'{label}: {scan}\n    {" ".join(statement.split())}')
+
+    for label, method, path in HOT_ROUTES:
+        url = path.format(**ctx)
+        headers = ctx['seller'] if 'my-auctions' in url else ctx['buyer']
+        if method == 'POST':
+            check(label, lambda: http.post(url, json={'amount': 1000}, headers=headers))
+        else:
+            check(label, lambda: http.get(url, headers=headers))
+
+    closer = AuctionCloser(app)
+    def run_closer():
+        with app.app_context():
+            closer.catch_up()
+            closer._scan_horizon()
+    check('auction closer', run_closer)
+    return problems
+
+def test_hot_queries_use_indexes():
+    problems = check_plans()
+    assert not problems, 'Full table scans:\n' + '\n'.join(problems)
+
+if __name__ == '__main__':
+    problems = check_plans()
+    if problems:
+        print('Full table scans:')
+        for problem in problems:
+            print(f'  - {problem}')
+        sys.exit(1)
+    print(f'All {len(HOT_ROUTES) + 1} hot query paths are index-backed.')
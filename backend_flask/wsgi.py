@@ -0,0 +1,15 @@
+"""
+Entrypoint for serving the API outside the dev server, e.g.
+
+    gunicorn -w 4 wsgi:app
+    flask --app wsgi run
+
+Every serving process starts its background jobs here; with several
+workers the leader lease (LEADER_LEASE_TTL) picks the one that closes
+auctions. Run migrate_db.py first, and do not use gunicorn --preload:
+threads started before the fork do not survive into the workers.
+"""
+from app import create_app, start_background_jobs
+
+app = create_app()
+start_background_jobs(app)